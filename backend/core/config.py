@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Dict, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # config.py está en: Proyecto_final_orto/backend/core/config.py
@@ -9,9 +10,35 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 ENV_FILE = str(BASE_DIR / ".env")
 
 class Settings(BaseSettings):
-    MONGODB_URL: str
+    MONGODB_URL: Optional[str] = None
+    # "mongo" (Motor) o "memory" (todo en proceso, sin Mongo)
+    STORAGE_BACKEND: Literal["mongo", "memory"] = "mongo"
+
+    # Lecturas de listados (catálogo, historial, usuarios) → secundarios.
+    # Reservas, cancelaciones y login siguen en el primario.
+    BROWSE_READ_PREFERENCE: Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"] = "secondaryPreferred"
+    BROWSE_MAX_STALENESS_SECONDS: int = 90  # mínimo que acepta Mongo: 90 (-1 = sin límite)
+    BROWSE_READ_CONCERN: Literal["local", "available", "majority"] = "local"
+    PRIMARY_READ_CONCERN: Literal["local", "majority", "linearizable"] = "local"
+
+    # Plazo por operación de BD (segundos); DB_OPERATION_TIMEOUTS lo ajusta por "repo.método"
+    DB_TIMEOUT_SECONDS: float = 2.0
+    DB_OPERATION_TIMEOUTS: Dict[str, float] = {"activities.insert_many": 30.0, "activities.search": 5.0}
+    # Circuit breaker: fallos seguidos para abrirlo y segundos hasta volver a probar
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SECONDS: float = 15.0
     PROJECT_NAME: str = "Proyecto Final 2DAM"
     DATABASE_NAME: str = "gym_db"
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+
+    # Recordatorios de clase (planificador en proceso, ver core/reminders.py)
+    REMINDERS_ENABLED: bool = True
+    REMINDER_LEAD_MINUTES: int = 60           # antelación del aviso
+    REMINDER_TICK_SECONDS: float = 30
+    REMINDER_BATCH_WINDOW_SECONDS: int = 60   # avisos de la misma ventana → un lote
+    REMINDER_HORIZON_HOURS: int = 24          # reservas cargadas en memoria
+    REMINDER_SENDER: Literal["log"] = "log"
+    REMINDER_LOG_PATH: str = "reminders.log"
 
     model_config = SettingsConfigDict(env_file=ENV_FILE, extra="ignore")
 
@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional, Type
+
+def _mongo_key(name: str, alias: Optional[str]):
+    # El id de los modelos siempre sale del _id de Mongo
+    if name == "id":
+        return "_id"
+    return alias or name
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]):
+    """
+    Convierte `fields=title,start_time` en una proyección de Mongo para `model`.
+    Devuelve None si no se pide nada (documento completo). El _id se incluye siempre.
+    """
+    if not fields:
+        return None
+
+    keys = {}
+    for name, info in model.model_fields.items():
+        keys[name] = _mongo_key(name, info.alias)
+        if info.alias:
+            keys[info.alias] = keys[name]
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in keys]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    projection = {"_id": 1}
+    for f in requested:
+        projection[keys[f]] = 1
+    return projection
+
+def partial_response(model: Type[BaseModel], docs: List[dict], projection: dict):
+    """Serializa solo los campos proyectados, con los mismos encoders que `model`."""
+    include = {
+        name for name, info in model.model_fields.items()
+        if _mongo_key(name, info.alias) in projection
+    }
+    return JSONResponse([
+        model.model_construct(**doc).model_dump(mode="json", by_alias=True, include=include)
+        for doc in docs
+    ])
@@ -0,0 +1,255 @@
+"""
+Recordatorios de clase. Un planificador en proceso (arrancado en el lifespan
+de la app) guarda en un heap la hora de aviso de las reservas activas
+próximas y, en cada tick, agrupa las que vencen por ventana de tiempo y las
+entrega a un ReminderSender.
+
+- Solo se cargan reservas dentro de REMINDER_HORIZON_HOURS (consulta por
+  rango sobre el índice (status, activity_start_time)); nunca se recorre
+  toda la colección.
+- Las altas, cancelaciones y cambios de horario actualizan el heap
+  (schedule / cancel); las entradas obsoletas se descartan al sacarlas.
+- Antes de enviar se releen la reserva, la clase y el socio: si alguno ya no
+  existe (o la reserva no está activa), el aviso se descarta.
+- Entrega al menos una vez: `reminder_sent_at` se guarda después de enviar,
+  y si el envío falla se reintenta en el siguiente tick.
+"""
+
+import asyncio
+import heapq
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from backend.core.config import settings
+from backend.db.base import to_naive_utc
+from backend.db.storage import get_storage
+from backend.models.reservation import ReservationStatus
+
+
+class ReminderSender(ABC):
+    @abstractmethod
+    async def send_batch(self, reminders: List[dict]) -> None:
+        """Entrega un lote; si lanza una excepción, el lote se reintenta."""
+
+
+class LogReminderSender(ReminderSender):
+    """Escribe cada recordatorio como una línea JSON en un fichero (pruebas / desarrollo)."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _write(self, lines: List[str]):
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def send_batch(self, reminders):
+        lines = [json.dumps(r, default=str, ensure_ascii=False) for r in reminders]
+        await asyncio.to_thread(self._write, lines)
+        print(f"🔔 {len(reminders)} recordatorios enviados → {self.path}")
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        sender: ReminderSender,
+        lead: timedelta,
+        tick_seconds: float,
+        window_seconds: float,
+        horizon: timedelta,
+    ):
+        self.sender = sender
+        self.lead = lead
+        self.tick_seconds = tick_seconds
+        self.window_seconds = window_seconds
+        self.horizon = horizon
+        # (remind_at, reservation_id); `scheduled` guarda la hora vigente de cada reserva
+        self.heap: List[tuple] = []
+        self.scheduled: Dict[str, datetime] = {}
+        # Las reservas que empiezan antes de esto ya están en el heap
+        self.loaded_until: Optional[datetime] = None
+        self.task: Optional[asyncio.Task] = None
+        # Reservas ya resueltas (marcadas o reprogramadas) en el dispatch en curso
+        self.handled: set = set()
+
+    # --- Alimentación del heap ---
+
+    def _push(self, reservation_id: str, remind_at: datetime):
+        self.scheduled[reservation_id] = remind_at
+        heapq.heappush(self.heap, (remind_at, reservation_id))
+
+    def schedule(self, reservation_id: str, activity_start_time: datetime):
+        start = to_naive_utc(activity_start_time)
+        if self.loaded_until is None or start >= self.loaded_until:
+            # Fuera del horizonte: la siguiente recarga la recogerá
+            self.scheduled.pop(reservation_id, None)
+            return
+        self._push(reservation_id, start - self.lead)
+
+    def cancel(self, reservation_id: str):
+        self.scheduled.pop(reservation_id, None)
+
+    async def load_until(self, until: datetime):
+        previous = self.loaded_until
+        start = previous or datetime.utcnow()
+        # Primero se amplía el horizonte para que las altas concurrentes entren en el heap
+        self.loaded_until = until
+        try:
+            pending = await get_storage().reservations.list_pending_reminders(start, until)
+        except Exception:
+            # Sin BD: se volverá a cargar el mismo tramo en el siguiente tick
+            self.loaded_until = previous
+            raise
+        for res in pending:
+            self._push(str(res["_id"]), res["activity_start_time"] - self.lead)
+
+    # --- Envío ---
+
+    def _pop_due(self, now: datetime):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            remind_at, reservation_id = heapq.heappop(self.heap)
+            if self.scheduled.get(reservation_id) != remind_at:
+                continue  # cancelada o reprogramada
+            del self.scheduled[reservation_id]
+            due.append((remind_at, reservation_id))
+        return due
+
+    def _retry(self, reservation_ids: List[str], now: datetime):
+        retry_at = now + timedelta(seconds=self.tick_seconds)
+        for reservation_id in reservation_ids:
+            self._push(reservation_id, retry_at)
+
+    async def dispatch_due(self):
+        now = datetime.utcnow()
+        due = self._pop_due(now)
+        if not due:
+            return
+        try:
+            await self._send_due(due, now)
+        except Exception:
+            # Lo que no llegó a marcarse se reintenta (al menos una vez)
+            self._retry([rid for _, rid in due if rid not in self.handled], now)
+            raise
+        finally:
+            self.handled.clear()
+
+    async def _send_due(self, due: list, now: datetime):
+        # Releer en una sola consulta: puede haber cambiado desde que se programó
+        storage = get_storage()
+        reservations = {str(r["_id"]): r for r in await storage.reservations.get_many([rid for _, rid in due])}
+        valid = [
+            (remind_at, reservations[rid]) for remind_at, rid in due
+            if rid in reservations
+            and reservations[rid]["status"] == ReservationStatus.ACTIVE
+            and reservations[rid].get("reminder_sent_at") is None
+            and reservations[rid]["activity_start_time"] > now
+        ]
+        if not valid:
+            return
+
+        # La clase o el socio pueden haberse borrado: esos avisos se descartan
+        activities, users = await asyncio.gather(
+            storage.activities.get_many(list({res["activity_id"] for _, res in valid}), {"_id": 1}),
+            storage.users.get_many(list({res["user_id"] for _, res in valid}), {"email": 1, "full_name": 1}),
+        )
+        activity_ids = {str(a["_id"]) for a in activities}
+        users_by_id = {str(u["_id"]): u for u in users}
+
+        # Un lote por ventana de tiempo
+        batches: Dict[int, list] = {}
+        for remind_at, res in valid:
+            user = users_by_id.get(res["user_id"])
+            if user is None or res["activity_id"] not in activity_ids:
+                continue
+            batches.setdefault(int(remind_at.timestamp() // self.window_seconds), []).append({
+                "reservation_id": str(res["_id"]),
+                "user_id": res["user_id"],
+                "email": user.get("email"),
+                "full_name": user.get("full_name"),
+                "activity_id": res["activity_id"],
+                "activity_title": res.get("activity_title"),
+                "activity_start_time": res["activity_start_time"],
+            })
+
+        for window in sorted(batches):
+            batch = batches[window]
+            ids = [r["reservation_id"] for r in batch]
+            try:
+                await self.sender.send_batch(batch)
+            except Exception as e:
+                print(f"⚠️  Error enviando recordatorios ({len(batch)}), se reintentará: {e}")
+                self._retry(ids, now)
+                self.handled.update(ids)
+                continue
+            await storage.reservations.mark_reminded(ids, datetime.utcnow())
+            self.handled.update(ids)
+
+    # --- Bucle ---
+
+    async def run(self):
+        while True:
+            try:
+                now = datetime.utcnow()
+                # Recargar cuando quede menos de medio horizonte cargado
+                if self.loaded_until is None or self.loaded_until - now < self.horizon / 2:
+                    await self.load_until(now + self.horizon)
+                await self.dispatch_due()
+            except Exception as e:
+                print(f"⚠️  Reminder scheduler error: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+class SchedulerHolder:
+    scheduler: Optional[ReminderScheduler] = None
+
+holder = SchedulerHolder()
+
+def get_reminder_scheduler() -> Optional[ReminderScheduler]:
+    return holder.scheduler
+
+def create_sender() -> ReminderSender:
+    if settings.REMINDER_SENDER == "log":
+        return LogReminderSender(settings.REMINDER_LOG_PATH)
+    raise ValueError(f"Unknown REMINDER_SENDER: {settings.REMINDER_SENDER}")
+
+def start_reminders(sender: Optional[ReminderSender] = None):
+    if not settings.REMINDERS_ENABLED:
+        return None
+    holder.scheduler = ReminderScheduler(
+        sender or create_sender(),
+        lead=timedelta(minutes=settings.REMINDER_LEAD_MINUTES),
+        tick_seconds=settings.REMINDER_TICK_SECONDS,
+        window_seconds=settings.REMINDER_BATCH_WINDOW_SECONDS,
+        horizon=timedelta(hours=settings.REMINDER_HORIZON_HOURS),
+    )
+    holder.scheduler.start()
+    return holder.scheduler
+
+async def stop_reminders():
+    if holder.scheduler:
+        await holder.scheduler.stop()
+        holder.scheduler = None
+
+# --- Hooks para los cambios de reservas (no hacen nada si el planificador no corre) ---
+
+def reminder_scheduled(reservation_id: str, activity_start_time: datetime):
+    if holder.scheduler:
+        holder.scheduler.schedule(reservation_id, activity_start_time)
+
+def reminder_cancelled(reservation_id: str):
+    if holder.scheduler:
+        holder.scheduler.cancel(reservation_id)
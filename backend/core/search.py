@@ -0,0 +1,22 @@
+import re
+import unicodedata
+
+# Campos indexados para la búsqueda de texto y su peso en la relevancia
+SEARCH_FIELDS = ("title", "description", "instructor", "location")
+SEARCH_WEIGHTS = {"title": 10, "instructor": 5, "location": 3, "description": 1}
+
+def normalize_search_text(text: str):
+    # minúsculas y sin tildes: "Pilátes" → "pilates"
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+def search_terms(text: str):
+    return re.findall(r"\w+", normalize_search_text(text)) if text else []
+
+def build_search_keywords(doc: dict):
+    """Palabras normalizadas de los campos de búsqueda (índice multikey para prefijos)."""
+    words = set()
+    for field in SEARCH_FIELDS:
+        if doc.get(field):
+            words.update(search_terms(doc[field]))
+    return sorted(words)
@@ -1,58 +1,301 @@
-from backend.db.mongodb import get_database
+from backend.db.storage import get_storage
+from backend.db.base import to_object_id, to_naive_utc
+from backend.core.search import SEARCH_FIELDS, build_search_keywords, search_terms
+from backend.core.reminders import reminder_scheduled, reminder_cancelled
+from backend.db.reservations import find_member_overlap
 from backend.models.activity import ActivityCreate, ActivityUpdate, ActivityInDB
+from backend.models.reservation import ReservationStatus
 from bson import ObjectId
 from datetime import datetime
+from typing import List, Optional
+import asyncio
 
-async def get_all_activities(skip: int = 0, limit: int = 100):
-    db = await get_database()
-    activities = []
-    cursor = db.activities.find().skip(skip).limit(limit).sort("start_time", 1)
-    async for doc in cursor:
+# Campos sobre los que no puede haber dos clases solapadas
+SCHEDULE_KEYS = ("location", "instructor")
+# Comprobaciones de un lote en vuelo a la vez (cada una son 4 consultas)
+BATCH_CHECK_CONCURRENCY = 10
+# Error de validación de un cambio de horario (422, no conflicto)
+INVALID_SCHEDULE = "end_time must be after start_time"
+
+async def get_all_activities(skip: int = 0, limit: int = 100, projection: Optional[dict] = None):
+    activities = await get_storage().activities.list(skip, limit, projection)
+    for doc in activities:
+        doc["_id"] = str(doc["_id"])
+    return activities
+
+async def get_upcoming_activities(limit: int = 100):
+    activities = await get_storage().activities.list_upcoming(datetime.utcnow(), limit)
+    for doc in activities:
         doc["_id"] = str(doc["_id"])
-        activities.append(doc)
     return activities
 
 async def get_activity(id: str):
-    db = await get_database()
-    try:
-        obj_id = ObjectId(id)
-    except:
-        return None
-    doc = await db.activities.find_one({"_id": obj_id})
+    doc = await get_storage().activities.get(id)
     if doc:
         doc["_id"] = str(doc["_id"])
     return doc
 
+async def search_activities(
+    q: Optional[str] = None,
+    prefix: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    available: bool = False,
+    skip: int = 0,
+    limit: int = 20,
+    projection: Optional[dict] = None,
+):
+    """
+    Búsqueda en el catálogo.
+    - prefix=False: índice de texto, ordenado por relevancia.
+    - prefix=True: cada término se busca como prefijo sobre `keywords`
+      (índice multikey), ordenado por fecha.
+    """
+    activities = await get_storage().activities.search(
+        search_terms(q), prefix, date_from, date_to, available, skip, limit, projection
+    )
+    for doc in activities:
+        doc["_id"] = str(doc["_id"])
+    return activities
+
+async def find_schedule_conflict(field: str, value: str, start_time: datetime, end_time: datetime, exclude_id: Optional[ObjectId] = None):
+    """
+    Busca una actividad con el mismo `field` (location / instructor) que se
+    solape con [start_time, end_time). Usa el índice (field, start_time):
+    como nunca se permiten solapes en el mismo field, basta con mirar la
+    primera clase que empieza dentro del rango y la última que empieza antes.
+    El invariante lo mantienen create/update (re-comprobación tras escribir);
+    los datos anteriores se revisan con init_db.py.
+    """
+    repo = get_storage().activities
+
+    # 1. Alguna clase empieza dentro del intervalo / 2. la última que empieza antes sigue en curso
+    inside, previous = await asyncio.gather(
+        repo.first_starting_between(field, value, start_time, end_time, exclude_id),
+        repo.last_starting_before(field, value, start_time, exclude_id),
+    )
+    if inside:
+        return inside
+    if previous and to_naive_utc(previous["end_time"]) > to_naive_utc(start_time):
+        return previous
+    return None
+
+def _conflict_message(field: str, doc: dict):
+    return f"Schedule conflict: {field} '{doc[field]}' already has '{doc.get('title', 'Unknown')}' at {doc['start_time'].isoformat()}"
+
+async def check_schedule_conflicts(activity_doc: dict, exclude_id: Optional[ObjectId] = None):
+    """Devuelve el mensaje del primer conflicto (location o instructor) o None."""
+    conflicts = await asyncio.gather(*(
+        find_schedule_conflict(field, activity_doc[field], activity_doc["start_time"], activity_doc["end_time"], exclude_id)
+        for field in SCHEDULE_KEYS
+    ))
+    for field, conflict in zip(SCHEDULE_KEYS, conflicts):
+        if conflict:
+            return _conflict_message(field, conflict)
+    return None
+
+async def check_member_conflicts(activity_id: str, start_time: datetime, end_time: datetime):
+    """
+    Socios con reserva activa en la clase a los que el nuevo horario les
+    solaparía con otra reserva suya. Devuelve [{"user_id", "error"}]; vacía si
+    ninguno.
+    """
+    reservations = await get_storage().reservations.list_by_activity(activity_id, [ReservationStatus.ACTIVE])
+    semaphore = asyncio.Semaphore(BATCH_CHECK_CONCURRENCY)
+
+    async def check(res):
+        async with semaphore:
+            return await find_member_overlap(res["user_id"], start_time, end_time, exclude_id=res["_id"])
+
+    overlaps = await asyncio.gather(*(check(res) for res in reservations))
+    return [
+        {"user_id": res["user_id"], "error": f"Already booked at that time: {overlap.get('activity_title', 'Unknown')}"}
+        for res, overlap in zip(reservations, overlaps) if overlap
+    ]
+
+async def validate_activity_batch(activities: List[ActivityCreate]):
+    """
+    Valida una importación masiva (p.ej. clases recurrentes). Comprueba cada
+    actividad contra la BD y contra el resto del lote (ordenando por hora de
+    inicio por location / instructor). Devuelve una lista de
+    {"index": i, "error": msg}; vacía si el lote es válido.
+    """
+    errors = []
+    docs = [activity.dict() for activity in activities]
+
+    # 1. Conflictos dentro del propio lote
+    for field in SCHEDULE_KEYS:
+        order = sorted(range(len(docs)), key=lambda i: (docs[i][field], to_naive_utc(docs[i]["start_time"])))
+        last_value, last_end, last_i = None, None, None
+        for i in order:
+            cur = docs[i]
+            start, end = to_naive_utc(cur["start_time"]), to_naive_utc(cur["end_time"])
+            if cur[field] == last_value and start < last_end:
+                errors.append({"index": i, "error": f"Schedule conflict: {field} '{cur[field]}' overlaps item {last_i} of the batch"})
+            if cur[field] != last_value or end > last_end:
+                last_value, last_end, last_i = cur[field], end, i
+
+    # 2. Conflictos contra las actividades ya guardadas (varias a la vez)
+    semaphore = asyncio.Semaphore(BATCH_CHECK_CONCURRENCY)
+
+    async def check(doc):
+        async with semaphore:
+            return await check_schedule_conflicts(doc)
+
+    results = await asyncio.gather(*(check(doc) for doc in docs))
+    errors.extend({"index": i, "error": error} for i, error in enumerate(results) if error)
+
+    errors.sort(key=lambda e: e["index"])
+    return errors
+
 async def create_activity(activity: ActivityCreate):
-    db = await get_database()
     activity_doc = activity.dict()
+
+    error = await check_schedule_conflicts(activity_doc)
+    if error:
+        return None, error
+
     activity_doc["booked_count"] = 0
+    activity_doc["keywords"] = build_search_keywords(activity_doc)
     activity_doc["created_at"] = datetime.utcnow()
     
-    result = await db.activities.insert_one(activity_doc)
-    return result.inserted_id
+    repo = get_storage().activities
+    inserted_id = await repo.insert(activity_doc)
 
-async def update_activity(id: str, activity_update: ActivityUpdate):
-    db = await get_database()
-    try:
-        obj_id = ObjectId(id)
-    except:
+    # Otra alta simultánea pudo pasar la misma comprobación: si ahora hay
+    # conflicto se deshace (las dos se ven y ninguna se queda)
+    error = await check_schedule_conflicts(activity_doc, exclude_id=inserted_id)
+    if error:
+        await repo.delete(inserted_id)
+        return None, error
+    return inserted_id, None
+
+async def find_applied_activity(activity: ActivityCreate):
+    """
+    Actividad idéntica a `activity` que dejó guardada un intento anterior con
+    la misma Idempotency-Key. Como una sala no admite solapes, solo puede ser
+    la primera clase que empieza a esa hora en esa sala.
+    """
+    doc = await get_storage().activities.first_starting_between(
+        "location", activity.location, activity.start_time, activity.end_time
+    )
+    if not doc:
         return None
+    for field, value in activity.dict().items():
+        stored = doc.get(field)
+        if isinstance(value, datetime) and stored is not None:
+            value, stored = to_naive_utc(value), to_naive_utc(stored)
+        if stored != value:
+            return None
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+async def create_activities_bulk(activities: List[ActivityCreate]):
+    """
+    Inserta un lote ya validado con un único insert_many. Devuelve (ids, errors):
+    si tras insertar aparece un conflicto (alta simultánea), se deshace el lote.
+    """
+    now = datetime.utcnow()
+    docs = []
+    for activity in activities:
+        doc = activity.dict()
+        doc["booked_count"] = 0
+        doc["keywords"] = build_search_keywords(doc)
+        doc["created_at"] = now
+        docs.append(doc)
+    repo = get_storage().activities
+    inserted_ids = await repo.insert_many(docs)
+
+    semaphore = asyncio.Semaphore(BATCH_CHECK_CONCURRENCY)
+
+    async def recheck(doc, oid):
+        async with semaphore:
+            return await check_schedule_conflicts(doc, exclude_id=oid)
+
+    results = await asyncio.gather(*(recheck(doc, oid) for doc, oid in zip(docs, inserted_ids)))
+    errors = [{"index": i, "error": error} for i, error in enumerate(results) if error]
+    if errors:
+        await asyncio.gather(*(repo.delete(oid) for oid in inserted_ids))
+        return [], errors
+    return [str(oid) for oid in inserted_ids], []
+
+async def update_activity(id: str, activity_update: ActivityUpdate):
+    """
+    Devuelve (modified_count, error). `error` es INVALID_SCHEDULE, el mensaje
+    de un conflicto de sala / monitor, o la lista de socios a los que el nuevo
+    horario les solaparía con otra reserva.
+    """
+    storage = get_storage()
+    repo = storage.activities
+    obj_id = to_object_id(id)
+    if obj_id is None:
+        return None, None
         
     update_data = {k: v for k, v in activity_update.dict().items() if v is not None}
     
     if len(update_data) >= 1:
-        result = await db.activities.update_one(
-            {"_id": obj_id}, {"$set": update_data}
-        )
-        return result.modified_count
-    return 0
+        schedule_changed = any(k in update_data for k in ("start_time", "end_time", *SCHEDULE_KEYS))
+        times_changed = "start_time" in update_data or "end_time" in update_data
+        text_changed = any(k in update_data for k in SEARCH_FIELDS)
+        if schedule_changed or text_changed:
+            current = await repo.get(obj_id)
+            if not current:
+                return 0, None
+            merged = {**current, **update_data}
+
+            # Si cambia el horario, la sala o el monitor, revalidar solapes
+            if schedule_changed:
+                if to_naive_utc(merged["end_time"]) <= to_naive_utc(merged["start_time"]):
+                    return 0, INVALID_SCHEDULE
+                error = await check_schedule_conflicts(merged, exclude_id=obj_id)
+                if error:
+                    return 0, error
+
+            # Los socios apuntados no pueden quedar con dos reservas solapadas
+            if times_changed:
+                members = await check_member_conflicts(id, merged["start_time"], merged["end_time"])
+                if members:
+                    return 0, members
+
+            if text_changed:
+                update_data["keywords"] = build_search_keywords(merged)
+
+        modified_count = await repo.update(obj_id, update_data)
+
+        # Re-comprobar tras escribir (cambio simultáneo): si hay conflicto, deshacer
+        if modified_count and schedule_changed:
+            error = await check_schedule_conflicts(merged, exclude_id=obj_id)
+            if error:
+                await repo.update(obj_id, {k: current.get(k) for k in update_data})
+                return 0, error
+
+        # Las reservas guardan una copia del horario: sincronizarla y reprogramar avisos
+        if modified_count and times_changed:
+            await storage.reservations.update_activity_schedule(id, merged["start_time"], merged["end_time"])
+
+            # Re-comprobar los socios (reserva simultánea): si hay conflicto, deshacer
+            members = await check_member_conflicts(id, merged["start_time"], merged["end_time"])
+            if members:
+                await repo.update(obj_id, {k: current.get(k) for k in update_data})
+                await storage.reservations.update_activity_schedule(id, current["start_time"], current["end_time"])
+                return 0, members
+
+            for res in await storage.reservations.list_by_activity(id, [ReservationStatus.ACTIVE]):
+                reminder_scheduled(str(res["_id"]), res["activity_start_time"])
+
+        return modified_count, None
+    return 0, None
 
 async def delete_activity(id: str):
-    db = await get_database()
-    try:
-        obj_id = ObjectId(id)
-    except:
+    storage = get_storage()
+    obj_id = to_object_id(id)
+    if obj_id is None:
         return None
-    result = await db.activities.delete_one({"_id": obj_id})
-    return result.deleted_count
+    deleted_count = await storage.activities.delete(obj_id)
+
+    # Las reservas activas de una clase borrada se cancelan y dejan de avisarse
+    if deleted_count:
+        for res in await storage.reservations.list_by_activity(id, [ReservationStatus.ACTIVE]):
+            await storage.reservations.set_status(res["_id"], ReservationStatus.CANCELLED, expected_status=ReservationStatus.ACTIVE)
+            reminder_cancelled(str(res["_id"]))
+    return deleted_count
@@ -0,0 +1,197 @@
+"""
+Interfaz de almacenamiento. Las funciones de backend/db/activities.py,
+users.py, reservations.py e idempotency.py contienen la lógica de negocio y
+delegan el acceso a datos en estos repositorios. Hay dos implementaciones:
+Motor (mongo_storage.py) y en memoria (memory_storage.py).
+
+Los documentos se devuelven como dicts con `_id` ObjectId, igual que Motor.
+"""
+
+from abc import ABC, abstractmethod
+from bson import ObjectId
+from datetime import datetime, timezone
+from typing import List, Optional
+
+def to_object_id(id):
+    # None si el id no es un ObjectId válido
+    if isinstance(id, ObjectId):
+        return id
+    try:
+        return ObjectId(id)
+    except Exception:
+        return None
+
+def to_naive_utc(value: datetime):
+    # Mongo devuelve fechas naive (UTC); las del cliente pueden venir con tz
+    if value.tzinfo:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ActivityRepository(ABC):
+    @abstractmethod
+    async def list(self, skip: int = 0, limit: int = 100, projection: Optional[dict] = None) -> List[dict]:
+        """Actividades ordenadas por start_time."""
+
+    @abstractmethod
+    async def list_upcoming(self, now: datetime, limit: int = 100) -> List[dict]:
+        """Actividades con start_time >= now, ordenadas por start_time."""
+
+    @abstractmethod
+    async def get(self, id) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_many(self, ids: List, projection: Optional[dict] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def search(
+        self,
+        terms: List[str],
+        prefix: bool,
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+        available: bool,
+        skip: int,
+        limit: int,
+        projection: Optional[dict] = None,
+    ) -> List[dict]:
+        """Texto (relevancia) o prefijos sobre `keywords`, con filtros de fecha y aforo."""
+
+    @abstractmethod
+    async def first_starting_between(self, field: str, value: str, start: datetime, end: datetime, exclude_id=None) -> Optional[dict]:
+        """Primera actividad con doc[field] == value y start <= start_time < end."""
+
+    @abstractmethod
+    async def last_starting_before(self, field: str, value: str, start: datetime, exclude_id=None) -> Optional[dict]:
+        """Última actividad con doc[field] == value y start_time < start."""
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> ObjectId:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, docs: List[dict]) -> List[ObjectId]:
+        ...
+
+    @abstractmethod
+    async def update(self, id, data: dict) -> int:
+        """$set de `data`; devuelve el número de documentos modificados."""
+
+    @abstractmethod
+    async def delete(self, id) -> int:
+        ...
+
+    @abstractmethod
+    async def book_spot(self, id) -> bool:
+        """Incrementa booked_count solo si queda aforo (atómico)."""
+
+    @abstractmethod
+    async def release_spot(self, id) -> None:
+        ...
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_many(self, ids: List, projection: Optional[dict] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> ObjectId:
+        """Lanza DuplicateKeyError si el email ya existe."""
+
+    @abstractmethod
+    async def list(self, projection: Optional[dict] = None) -> List[dict]:
+        """Usuarios ordenados por created_at descendente."""
+
+    @abstractmethod
+    async def delete(self, id) -> int:
+        ...
+
+
+class ReservationRepository(ABC):
+    @abstractmethod
+    async def get(self, id) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def get_many(self, ids: List) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def find_active(self, user_id: str, activity_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> ObjectId:
+        """Lanza DuplicateKeyError si ya hay una reserva activa (user_id, activity_id)."""
+
+    @abstractmethod
+    async def set_status(self, id, status: str, expected_status: Optional[str] = None) -> int:
+        """Cambia el estado (solo si el actual es `expected_status`, si se indica)."""
+
+    @abstractmethod
+    async def list_by_user(self, user_id: str, projection: Optional[dict] = None) -> List[dict]:
+        """Reservas del usuario ordenadas por activity_start_time descendente."""
+
+    @abstractmethod
+    async def list_by_activity(self, activity_id: str, statuses: List[str]) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def delete(self, id) -> int:
+        """Solo para deshacer una reserva recién creada; las bajas normales cambian el estado."""
+
+    @abstractmethod
+    async def first_active_starting_between(self, user_id: str, start: datetime, end: datetime, exclude_id=None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def last_active_starting_before(self, user_id: str, start: datetime, exclude_id=None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list_pending_reminders(self, start: datetime, end: datetime) -> List[dict]:
+        """Reservas activas sin recordatorio enviado con start <= activity_start_time < end."""
+
+    @abstractmethod
+    async def mark_reminded(self, ids: List, sent_at: datetime) -> None:
+        ...
+
+    @abstractmethod
+    async def update_activity_schedule(self, activity_id: str, start_time: datetime, end_time: datetime) -> None:
+        """Copia el nuevo horario de la actividad a sus reservas y rearma su recordatorio."""
+
+
+class IdempotencyRepository(ABC):
+    @abstractmethod
+    async def get(self, id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> None:
+        """Lanza DuplicateKeyError si la clave ya existe."""
+
+    @abstractmethod
+    async def replace(self, doc: dict) -> None:
+        """Upsert del documento completo."""
+
+    @abstractmethod
+    async def delete(self, id: str, status: str) -> None:
+        ...
+
+    @abstractmethod
+    async def touch(self, id: str, status: str, created_at: datetime, new_created_at: datetime) -> int:
+        """Renueva created_at solo si no ha cambiado (toma de una petición abandonada)."""
+
+
+class Storage(ABC):
+    activities: ActivityRepository
+    users: UserRepository
+    reservations: ReservationRepository
+    idempotency: IdempotencyRepository
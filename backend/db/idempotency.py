@@ -0,0 +1,120 @@
+from backend.db.storage import get_storage
+from backend.core.config import settings
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import hashlib
+import json
+
+# Una petición "processing" más antigua se considera abandonada (p.ej. caída del worker)
+PROCESSING_TIMEOUT_SECONDS = 60
+PROCESSING = "processing"
+COMPLETED = "completed"
+
+# Misma clave con otro cuerpo: error del cliente (422), no se reenvía la respuesta guardada
+KEY_REUSED = "This Idempotency-Key was already used with a different request body"
+
+# Las respuestas se guardan IDEMPOTENCY_TTL_SECONDS (índice TTL sobre created_at).
+# Caché en memoria de respuestas ya completadas (LRU pequeña delante de Mongo)
+CACHE_MAX_ITEMS = 1024
+_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+def _record_id(user_id: str, scope: str, key: str):
+    return f"{user_id}:{scope}:{key}"
+
+def request_hash(payload) -> str:
+    # Huella del cuerpo canónico (claves ordenadas, fechas ISO) de la petición
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _cache_get(record_id: str):
+    record = _cache.get(record_id)
+    if record is None:
+        return None
+    if datetime.utcnow() - record["created_at"] > timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS):
+        del _cache[record_id]
+        return None
+    _cache.move_to_end(record_id)
+    return record
+
+def _cache_put(record: dict):
+    _cache[record["_id"]] = record
+    _cache.move_to_end(record["_id"])
+    while len(_cache) > CACHE_MAX_ITEMS:
+        _cache.popitem(last=False)
+
+async def begin_idempotent_request(user_id: str, scope: str, key: str, payload):
+    """
+    Devuelve (record, error):
+    - (record, None) con status COMPLETED: ya hay respuesta guardada → reenviarla.
+    - (record, None) con status PROCESSING: un intento anterior quedó a medias
+      (p.ej. 503 con la escritura sin confirmar) → ejecutar de nuevo, aceptando
+      como propia la escritura que ya se hubiera aplicado.
+    - (None, None): primera vez → ejecutar y llamar a complete_idempotent_request.
+    - (None, error): la misma petición sigue en curso, o la clave se usó con
+      otro cuerpo (error == KEY_REUSED).
+    """
+    record_id = _record_id(user_id, scope, key)
+    fingerprint = request_hash(payload)
+    cached = _cache_get(record_id)
+    if cached:
+        return (cached, None) if cached.get("request_hash") == fingerprint else (None, KEY_REUSED)
+
+    repo = get_storage().idempotency
+    record = await repo.get(record_id)
+    if record is None:
+        try:
+            await repo.insert({
+                "_id": record_id,
+                "status": PROCESSING,
+                "request_hash": fingerprint,
+                "created_at": datetime.utcnow()
+            })
+            return None, None
+        except DuplicateKeyError:
+            # Otro reintento ha llegado a la vez
+            record = await repo.get(record_id)
+
+    if record and record.get("request_hash") != fingerprint:
+        return None, KEY_REUSED
+
+    if record and record["status"] == COMPLETED:
+        _cache_put(record)
+        return record, None
+
+    if record and datetime.utcnow() - record["created_at"] > timedelta(seconds=PROCESSING_TIMEOUT_SECONDS):
+        taken = await repo.touch(record_id, PROCESSING, record["created_at"], datetime.utcnow())
+        if taken:
+            return record, None
+    return None, "A request with this Idempotency-Key is still in progress"
+
+async def complete_idempotent_request(user_id: str, scope: str, key: str, payload, status_code: int, body):
+    record = {
+        "_id": _record_id(user_id, scope, key),
+        "status": COMPLETED,
+        "request_hash": request_hash(payload),
+        "status_code": status_code,
+        "body": body,
+        "created_at": datetime.utcnow()
+    }
+    await get_storage().idempotency.replace(record)
+    _cache_put(record)
+
+async def abort_idempotent_request(user_id: str, scope: str, key: str):
+    # Error inesperado sin nada escrito: liberar la clave para que el cliente pueda reintentar.
+    # Con DatabaseUnavailable no se llama: la escritura puede haberse aplicado y el
+    # registro se queda en PROCESSING hasta que un reintento lo retome.
+    await get_storage().idempotency.delete(_record_id(user_id, scope, key), PROCESSING)
+
+def is_completed(record: dict):
+    return record["status"] == COMPLETED
+
+def idempotent_replay(record: dict):
+    # Reenvía la respuesta original tal cual, sin volver a escribir en la BD
+    return JSONResponse(
+        status_code=record["status_code"],
+        content=record["body"],
+        headers={"Idempotent-Replayed": "true"}
+    )
@@ -0,0 +1,423 @@
+"""
+Motor de almacenamiento en memoria. Mantiene los mismos índices que Mongo
+(listas ordenadas con bisect y dicts) para que las consultas tengan el mismo
+coste asintótico, y ninguna operación cede el control al event loop a mitad,
+así que cada método es atómico (p.ej. book_spot respeta el aforo).
+
+Pensado para tests, benchmarks y ejecutar la API sin Mongo
+(STORAGE_BACKEND=memory).
+"""
+
+import copy
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from backend.core.config import settings
+from backend.core.search import SEARCH_FIELDS, SEARCH_WEIGHTS, search_terms
+from backend.db.base import (
+    ActivityRepository, UserRepository, ReservationRepository, IdempotencyRepository, Storage,
+    to_object_id, to_naive_utc
+)
+from backend.models.reservation import ReservationStatus
+
+
+def _store(doc: dict):
+    # Copia con fechas naive UTC, como las guarda Mongo
+    stored = copy.deepcopy(doc)
+    for key, value in stored.items():
+        if isinstance(value, datetime):
+            stored[key] = to_naive_utc(value)
+    return stored
+
+def _project(doc: dict, projection: Optional[dict] = None):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v == 1 or v is True}
+    if include:
+        if projection.get("_id", 1):
+            include.add("_id")
+        return {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+    exclude = {k for k, v in projection.items() if v == 0 or v is False}
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in exclude}
+
+def _sort_key(value):
+    # Documentos sin fecha primero, como hace Mongo con null
+    return (value is not None, value)
+
+
+class MemoryActivityRepository(ActivityRepository):
+    SCHEDULE_FIELDS = ("location", "instructor")
+
+    def __init__(self):
+        self.docs: Dict[ObjectId, dict] = {}
+        # (start_time, _id) ordenado → listados y rangos de fecha
+        self.by_start: list = []
+        # (field, value) → [(start_time, _id)] ordenado → solapes
+        self.by_schedule: Dict[tuple, list] = defaultdict(list)
+        # keyword → {_id}, y lista ordenada de keywords → prefijos
+        self.by_keyword: Dict[str, Set[ObjectId]] = defaultdict(set)
+        self.keywords: List[str] = []
+
+    def _index(self, doc):
+        key = (doc["start_time"], doc["_id"])
+        insort(self.by_start, key)
+        for field in self.SCHEDULE_FIELDS:
+            insort(self.by_schedule[(field, doc.get(field))], key)
+        for word in doc.get("keywords", []):
+            if not self.by_keyword[word]:
+                insort(self.keywords, word)
+            self.by_keyword[word].add(doc["_id"])
+
+    def _unindex(self, doc):
+        key = (doc["start_time"], doc["_id"])
+        self.by_start.pop(bisect_left(self.by_start, key))
+        for field in self.SCHEDULE_FIELDS:
+            entries = self.by_schedule[(field, doc.get(field))]
+            entries.pop(bisect_left(entries, key))
+        for word in doc.get("keywords", []):
+            self.by_keyword[word].discard(doc["_id"])
+            if not self.by_keyword[word]:
+                del self.by_keyword[word]
+                self.keywords.pop(bisect_left(self.keywords, word))
+
+    def _ordered(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        lo = bisect_left(self.by_start, (to_naive_utc(start),)) if start else 0
+        hi = bisect_left(self.by_start, (to_naive_utc(end),)) if end else len(self.by_start)
+        for _, oid in self.by_start[lo:hi]:
+            yield self.docs[oid]
+
+    async def list(self, skip=0, limit=100, projection=None):
+        return [_project(self.docs[oid], projection) for _, oid in self.by_start[skip:skip + limit]]
+
+    async def list_upcoming(self, now, limit=100):
+        result = []
+        for doc in self._ordered(start=now):
+            if len(result) >= limit:
+                break
+            result.append(_project(doc))
+        return result
+
+    async def get(self, id):
+        doc = self.docs.get(to_object_id(id))
+        return _project(doc) if doc else None
+
+    async def get_many(self, ids, projection=None):
+        docs = (self.docs.get(to_object_id(i)) for i in ids)
+        return [_project(doc, projection) for doc in docs if doc]
+
+    def _prefix_matches(self, term):
+        ids = set()
+        i = bisect_left(self.keywords, term)
+        while i < len(self.keywords) and self.keywords[i].startswith(term):
+            ids |= self.by_keyword[self.keywords[i]]
+            i += 1
+        return ids
+
+    def _text_score(self, doc, terms):
+        score = 0.0
+        for field in SEARCH_FIELDS:
+            words = search_terms(doc.get(field) or "")
+            if words:
+                matches = sum(words.count(t) for t in terms)
+                score += SEARCH_WEIGHTS[field] * matches / len(words)
+        return score
+
+    async def search(self, terms, prefix, date_from, date_to, available, skip, limit, projection=None):
+        if terms:
+            if prefix:
+                # Todos los términos deben coincidir como prefijo
+                ids = None
+                for term in terms:
+                    matches = self._prefix_matches(term)
+                    ids = matches if ids is None else ids & matches
+            else:
+                # Basta con que aparezca algún término (como $text)
+                ids = set().union(*(self.by_keyword.get(t, set()) for t in terms))
+            candidates = [self.docs[oid] for oid in ids]
+        else:
+            candidates = list(self._ordered(date_from, date_to))
+
+        date_from = to_naive_utc(date_from) if date_from else None
+        date_to = to_naive_utc(date_to) if date_to else None
+        results = [
+            doc for doc in candidates
+            if (date_from is None or doc["start_time"] >= date_from)
+            and (date_to is None or doc["start_time"] < date_to)
+            and (not available or doc.get("booked_count", 0) < doc["capacity"])
+        ]
+
+        if terms and not prefix:
+            results.sort(key=lambda d: (-self._text_score(d, terms), d["start_time"]))
+        elif terms:
+            results.sort(key=lambda d: d["start_time"])
+        return [_project(doc, projection) for doc in results[skip:skip + limit]]
+
+    async def first_starting_between(self, field, value, start, end, exclude_id=None):
+        entries = self.by_schedule.get((field, value), [])
+        i = bisect_left(entries, (to_naive_utc(start),))
+        end = to_naive_utc(end)
+        while i < len(entries) and entries[i][0] < end:
+            if entries[i][1] != exclude_id:
+                return _project(self.docs[entries[i][1]])
+            i += 1
+        return None
+
+    async def last_starting_before(self, field, value, start, exclude_id=None):
+        entries = self.by_schedule.get((field, value), [])
+        i = bisect_left(entries, (to_naive_utc(start),)) - 1
+        while i >= 0:
+            if entries[i][1] != exclude_id:
+                return _project(self.docs[entries[i][1]])
+            i -= 1
+        return None
+
+    async def insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"Duplicate _id {doc['_id']}")
+        stored = _store(doc)
+        self.docs[stored["_id"]] = stored
+        self._index(stored)
+        return stored["_id"]
+
+    async def insert_many(self, docs):
+        return [await self.insert(doc) for doc in docs]
+
+    async def update(self, id, data):
+        doc = self.docs.get(to_object_id(id))
+        if doc is None:
+            return 0
+        changes = _store(data)
+        if all(doc.get(k) == v for k, v in changes.items()):
+            return 0
+        self._unindex(doc)
+        doc.update(changes)
+        self._index(doc)
+        return 1
+
+    async def delete(self, id):
+        doc = self.docs.pop(to_object_id(id), None)
+        if doc is None:
+            return 0
+        self._unindex(doc)
+        return 1
+
+    async def book_spot(self, id):
+        doc = self.docs.get(to_object_id(id))
+        if doc is None or doc.get("booked_count", 0) >= doc["capacity"]:
+            return False
+        doc["booked_count"] = doc.get("booked_count", 0) + 1
+        return True
+
+    async def release_spot(self, id):
+        doc = self.docs.get(to_object_id(id))
+        if doc is not None:
+            doc["booked_count"] = doc.get("booked_count", 0) - 1
+
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self):
+        self.docs: Dict[ObjectId, dict] = {}
+        self.by_email: Dict[str, ObjectId] = {}
+
+    async def get_by_email(self, email):
+        oid = self.by_email.get(email)
+        return _project(self.docs[oid]) if oid else None
+
+    async def get_many(self, ids, projection=None):
+        docs = (self.docs.get(to_object_id(i)) for i in ids)
+        return [_project(doc, projection) for doc in docs if doc]
+
+    async def insert(self, doc):
+        if doc["email"] in self.by_email:
+            raise DuplicateKeyError(f"Duplicate email {doc['email']}")
+        doc.setdefault("_id", ObjectId())
+        stored = _store(doc)
+        self.docs[stored["_id"]] = stored
+        self.by_email[stored["email"]] = stored["_id"]
+        return stored["_id"]
+
+    async def list(self, projection=None):
+        docs = sorted(self.docs.values(), key=lambda d: _sort_key(d.get("created_at")), reverse=True)
+        return [_project(doc, projection) for doc in docs]
+
+    async def delete(self, id):
+        doc = self.docs.pop(to_object_id(id), None)
+        if doc is None:
+            return 0
+        del self.by_email[doc["email"]]
+        return 1
+
+
+class MemoryReservationRepository(ReservationRepository):
+    def __init__(self):
+        self.docs: Dict[ObjectId, dict] = {}
+        self.by_user: Dict[str, List[ObjectId]] = defaultdict(list)
+        self.by_activity: Dict[str, List[ObjectId]] = defaultdict(list)
+        # Índice único parcial (user_id, activity_id) si status == active
+        self.active_pairs: Dict[tuple, ObjectId] = {}
+        # user_id → [(activity_start_time, _id)] ordenado, solo reservas activas
+        self.active_by_user: Dict[str, list] = defaultdict(list)
+        # [(activity_start_time, _id)] ordenado, solo reservas activas → recordatorios
+        self.active_by_start: list = []
+
+    def _add_active(self, doc):
+        self.active_pairs[(doc["user_id"], doc["activity_id"])] = doc["_id"]
+        if doc.get("activity_start_time") is not None:
+            key = (doc["activity_start_time"], doc["_id"])
+            insort(self.active_by_user[doc["user_id"]], key)
+            insort(self.active_by_start, key)
+
+    def _remove_active(self, doc):
+        self.active_pairs.pop((doc["user_id"], doc["activity_id"]), None)
+        if doc.get("activity_start_time") is not None:
+            key = (doc["activity_start_time"], doc["_id"])
+            entries = self.active_by_user[doc["user_id"]]
+            entries.pop(bisect_left(entries, key))
+            self.active_by_start.pop(bisect_left(self.active_by_start, key))
+
+    async def get(self, id):
+        doc = self.docs.get(to_object_id(id))
+        return _project(doc) if doc else None
+
+    async def get_many(self, ids):
+        docs = (self.docs.get(to_object_id(i)) for i in ids)
+        return [_project(doc) for doc in docs if doc]
+
+    async def find_active(self, user_id, activity_id):
+        oid = self.active_pairs.get((user_id, activity_id))
+        return _project(self.docs[oid]) if oid else None
+
+    async def insert(self, doc):
+        is_active = doc.get("status") == ReservationStatus.ACTIVE
+        if is_active and (doc["user_id"], doc["activity_id"]) in self.active_pairs:
+            raise DuplicateKeyError("Duplicate active reservation")
+        doc.setdefault("_id", ObjectId())
+        stored = _store(doc)
+        self.docs[stored["_id"]] = stored
+        self.by_user[stored["user_id"]].append(stored["_id"])
+        self.by_activity[stored["activity_id"]].append(stored["_id"])
+        if is_active:
+            self._add_active(stored)
+        return stored["_id"]
+
+    async def set_status(self, id, status, expected_status=None):
+        doc = self.docs.get(to_object_id(id))
+        if doc is None or doc["status"] == status:
+            return 0
+        if expected_status is not None and doc["status"] != expected_status:
+            return 0
+        if status == ReservationStatus.ACTIVE and (doc["user_id"], doc["activity_id"]) in self.active_pairs:
+            raise DuplicateKeyError("Duplicate active reservation")
+        if doc["status"] == ReservationStatus.ACTIVE:
+            self._remove_active(doc)
+        doc["status"] = status
+        if status == ReservationStatus.ACTIVE:
+            self._add_active(doc)
+        return 1
+
+    async def list_by_user(self, user_id, projection=None):
+        docs = [self.docs[oid] for oid in self.by_user.get(user_id, [])]
+        docs.sort(key=lambda d: _sort_key(d.get("activity_start_time")), reverse=True)
+        return [_project(doc, projection) for doc in docs]
+
+    async def list_by_activity(self, activity_id, statuses):
+        docs = (self.docs[oid] for oid in self.by_activity.get(activity_id, []))
+        return [_project(doc) for doc in docs if doc["status"] in statuses]
+
+    async def delete(self, id):
+        doc = self.docs.pop(to_object_id(id), None)
+        if doc is None:
+            return 0
+        if doc["status"] == ReservationStatus.ACTIVE:
+            self._remove_active(doc)
+        self.by_user[doc["user_id"]].remove(doc["_id"])
+        self.by_activity[doc["activity_id"]].remove(doc["_id"])
+        return 1
+
+    async def first_active_starting_between(self, user_id, start, end, exclude_id=None):
+        entries = self.active_by_user.get(user_id, [])
+        i = bisect_left(entries, (to_naive_utc(start),))
+        end = to_naive_utc(end)
+        while i < len(entries) and entries[i][0] < end:
+            if entries[i][1] != exclude_id:
+                return _project(self.docs[entries[i][1]])
+            i += 1
+        return None
+
+    async def last_active_starting_before(self, user_id, start, exclude_id=None):
+        entries = self.active_by_user.get(user_id, [])
+        i = bisect_left(entries, (to_naive_utc(start),)) - 1
+        while i >= 0:
+            if entries[i][1] != exclude_id:
+                return _project(self.docs[entries[i][1]])
+            i -= 1
+        return None
+
+    async def list_pending_reminders(self, start, end):
+        lo = bisect_left(self.active_by_start, (to_naive_utc(start),))
+        hi = bisect_left(self.active_by_start, (to_naive_utc(end),))
+        docs = (self.docs[oid] for _, oid in self.active_by_start[lo:hi])
+        return [_project(doc) for doc in docs if doc.get("reminder_sent_at") is None]
+
+    async def mark_reminded(self, ids, sent_at):
+        for oid in ids:
+            doc = self.docs.get(to_object_id(oid))
+            if doc is not None:
+                doc["reminder_sent_at"] = to_naive_utc(sent_at)
+
+    async def update_activity_schedule(self, activity_id, start_time, end_time):
+        for oid in self.by_activity.get(activity_id, []):
+            doc = self.docs[oid]
+            is_active = doc["status"] == ReservationStatus.ACTIVE
+            if is_active:
+                self._remove_active(doc)
+            doc["activity_start_time"] = to_naive_utc(start_time)
+            doc["activity_end_time"] = to_naive_utc(end_time)
+            doc["reminder_sent_at"] = None
+            if is_active:
+                self._add_active(doc)
+
+
+class MemoryIdempotencyRepository(IdempotencyRepository):
+    def __init__(self):
+        self.docs: Dict[str, dict] = {}
+
+    async def get(self, id):
+        doc = self.docs.get(id)
+        # Equivalente al índice TTL de Mongo
+        if doc and datetime.utcnow() - doc["created_at"] > timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS):
+            del self.docs[id]
+            return None
+        return _project(doc) if doc else None
+
+    async def insert(self, doc):
+        if await self.get(doc["_id"]):
+            raise DuplicateKeyError(f"Duplicate key {doc['_id']}")
+        self.docs[doc["_id"]] = _store(doc)
+
+    async def replace(self, doc):
+        self.docs[doc["_id"]] = _store(doc)
+
+    async def delete(self, id, status):
+        doc = self.docs.get(id)
+        if doc and doc["status"] == status:
+            del self.docs[id]
+
+    async def touch(self, id, status, created_at, new_created_at):
+        doc = self.docs.get(id)
+        if doc and doc["status"] == status and doc["created_at"] == created_at:
+            doc["created_at"] = new_created_at
+            return 1
+        return 0
+
+
+class MemoryStorage(Storage):
+    def __init__(self):
+        self.activities = MemoryActivityRepository()
+        self.users = MemoryUserRepository()
+        self.reservations = MemoryReservationRepository()
+        self.idempotency = MemoryIdempotencyRepository()
@@ -0,0 +1,278 @@
+import re
+from pymongo import ReturnDocument
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from backend.core.config import settings
+from backend.db.base import (
+    ActivityRepository, UserRepository, ReservationRepository, IdempotencyRepository, Storage, to_object_id
+)
+from backend.models.reservation import ReservationStatus
+
+
+async def _to_list(cursor):
+    return [doc async for doc in cursor]
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def browse_read_options():
+    """Opciones para lecturas de listados: pueden ir a secundarios con un límite de desfase."""
+    name = settings.BROWSE_READ_PREFERENCE
+    if name == "primary":
+        read_preference = Primary()
+    else:
+        read_preference = READ_PREFERENCES[name](max_staleness=settings.BROWSE_MAX_STALENESS_SECONDS)
+    return {"read_preference": read_preference, "read_concern": ReadConcern(settings.BROWSE_READ_CONCERN)}
+
+def primary_read_options():
+    """Opciones para reservas, cancelaciones y login: siempre el primario."""
+    return {"read_preference": Primary(), "read_concern": ReadConcern(settings.PRIMARY_READ_CONCERN)}
+
+
+class MongoActivityRepository(ActivityRepository):
+    def __init__(self, database):
+        self.collection = database.activities.with_options(**primary_read_options())
+        self.browse = database.activities.with_options(**browse_read_options())
+
+    async def list(self, skip=0, limit=100, projection=None):
+        return await _to_list(self.browse.find({}, projection).skip(skip).limit(limit).sort("start_time", 1))
+
+    async def list_upcoming(self, now, limit=100):
+        # Usa el índice start_time
+        return await _to_list(self.browse.find({"start_time": {"$gte": now}}).sort("start_time", 1).limit(limit))
+
+    async def get(self, id):
+        obj_id = to_object_id(id)
+        if obj_id is None:
+            return None
+        return await self.collection.find_one({"_id": obj_id})
+
+    async def get_many(self, ids, projection=None):
+        oids = [oid for oid in (to_object_id(i) for i in ids) if oid is not None]
+        return await _to_list(self.collection.find({"_id": {"$in": oids}}, projection))
+
+    async def search(self, terms, prefix, date_from, date_to, available, skip, limit, projection=None):
+        query = {}
+        sort = [("start_time", 1)]
+
+        if terms and prefix:
+            # Regex anclada ^ sobre el índice multikey de keywords
+            query["$and"] = [{"keywords": {"$regex": f"^{re.escape(t)}"}} for t in terms]
+        elif terms:
+            query["$text"] = {"$search": " ".join(terms)}
+            projection = {**(projection or {}), "score": {"$meta": "textScore"}}
+            sort = [("score", {"$meta": "textScore"}), ("start_time", 1)]
+
+        if date_from or date_to:
+            query["start_time"] = {}
+            if date_from:
+                query["start_time"]["$gte"] = date_from
+            if date_to:
+                query["start_time"]["$lt"] = date_to
+
+        if available:
+            query["$expr"] = {"$lt": ["$booked_count", "$capacity"]}
+
+        return await _to_list(self.browse.find(query, projection).sort(sort).skip(skip).limit(limit))
+
+    def _schedule_filter(self, field, value, exclude_id):
+        base = {field: value}
+        if exclude_id is not None:
+            base["_id"] = {"$ne": exclude_id}
+        return base
+
+    async def first_starting_between(self, field, value, start, end, exclude_id=None):
+        return await self.collection.find_one(
+            {**self._schedule_filter(field, value, exclude_id), "start_time": {"$gte": start, "$lt": end}},
+            sort=[("start_time", 1)]
+        )
+
+    async def last_starting_before(self, field, value, start, exclude_id=None):
+        return await self.collection.find_one(
+            {**self._schedule_filter(field, value, exclude_id), "start_time": {"$lt": start}},
+            sort=[("start_time", -1)]
+        )
+
+    async def insert(self, doc):
+        result = await self.collection.insert_one(doc)
+        return result.inserted_id
+
+    async def insert_many(self, docs):
+        result = await self.collection.insert_many(docs)
+        return result.inserted_ids
+
+    async def update(self, id, data):
+        obj_id = to_object_id(id)
+        if obj_id is None:
+            return 0
+        result = await self.collection.update_one({"_id": obj_id}, {"$set": data})
+        return result.modified_count
+
+    async def delete(self, id):
+        obj_id = to_object_id(id)
+        if obj_id is None:
+            return 0
+        result = await self.collection.delete_one({"_id": obj_id})
+        return result.deleted_count
+
+    async def book_spot(self, id):
+        # El filtro y el $inc se aplican en una sola operación atómica
+        doc = await self.collection.find_one_and_update(
+            {"_id": to_object_id(id), "$expr": {"$lt": ["$booked_count", "$capacity"]}},
+            {"$inc": {"booked_count": 1}},
+            projection={"_id": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return doc is not None
+
+    async def release_spot(self, id):
+        await self.collection.update_one({"_id": to_object_id(id)}, {"$inc": {"booked_count": -1}})
+
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, database):
+        self.collection = database.users.with_options(**primary_read_options())
+        self.browse = database.users.with_options(**browse_read_options())
+
+    async def get_by_email(self, email):
+        return await self.collection.find_one({"email": email})
+
+    async def get_many(self, ids, projection=None):
+        oids = [oid for oid in (to_object_id(i) for i in ids) if oid is not None]
+        return await _to_list(self.collection.find({"_id": {"$in": oids}}, projection))
+
+    async def insert(self, doc):
+        result = await self.collection.insert_one(doc)
+        return result.inserted_id
+
+    async def list(self, projection=None):
+        # Sort by created_at desc (newest first)
+        return await _to_list(self.browse.find({}, projection).sort("created_at", -1))
+
+    async def delete(self, id):
+        obj_id = to_object_id(id)
+        if obj_id is None:
+            return 0
+        result = await self.collection.delete_one({"_id": obj_id})
+        return result.deleted_count
+
+
+class MongoReservationRepository(ReservationRepository):
+    def __init__(self, database):
+        # Siempre el primario: el socio debe ver su reserva justo después de hacerla
+        self.collection = database.reservations.with_options(**primary_read_options())
+
+    async def get(self, id):
+        obj_id = to_object_id(id)
+        if obj_id is None:
+            return None
+        return await self.collection.find_one({"_id": obj_id})
+
+    async def get_many(self, ids):
+        oids = [oid for oid in (to_object_id(i) for i in ids) if oid is not None]
+        return await _to_list(self.collection.find({"_id": {"$in": oids}}))
+
+    async def find_active(self, user_id, activity_id):
+        return await self.collection.find_one({
+            "user_id": user_id,
+            "activity_id": activity_id,
+            "status": ReservationStatus.ACTIVE
+        })
+
+    async def insert(self, doc):
+        result = await self.collection.insert_one(doc)
+        return result.inserted_id
+
+    async def set_status(self, id, status, expected_status=None):
+        query = {"_id": to_object_id(id)}
+        if expected_status is not None:
+            query["status"] = expected_status
+        result = await self.collection.update_one(query, {"$set": {"status": status}})
+        return result.modified_count
+
+    async def list_by_user(self, user_id, projection=None):
+        return await _to_list(self.collection.find({"user_id": user_id}, projection).sort("activity_start_time", -1))
+
+    async def list_by_activity(self, activity_id, statuses):
+        return await _to_list(self.collection.find({"activity_id": activity_id, "status": {"$in": statuses}}))
+
+    async def delete(self, id):
+        obj_id = to_object_id(id)
+        if obj_id is None:
+            return 0
+        result = await self.collection.delete_one({"_id": obj_id})
+        return result.deleted_count
+
+    def _active_filter(self, user_id, exclude_id):
+        base = {"user_id": user_id, "status": ReservationStatus.ACTIVE}
+        if exclude_id is not None:
+            base["_id"] = {"$ne": exclude_id}
+        return base
+
+    async def first_active_starting_between(self, user_id, start, end, exclude_id=None):
+        return await self.collection.find_one(
+            {**self._active_filter(user_id, exclude_id), "activity_start_time": {"$gte": start, "$lt": end}},
+            sort=[("activity_start_time", 1)]
+        )
+
+    async def last_active_starting_before(self, user_id, start, exclude_id=None):
+        return await self.collection.find_one(
+            {**self._active_filter(user_id, exclude_id), "activity_start_time": {"$lt": start}},
+            sort=[("activity_start_time", -1)]
+        )
+
+    async def list_pending_reminders(self, start, end):
+        # Índice (status, activity_start_time)
+        return await _to_list(self.collection.find({
+            "status": ReservationStatus.ACTIVE,
+            "activity_start_time": {"$gte": start, "$lt": end},
+            "reminder_sent_at": None
+        }))
+
+    async def mark_reminded(self, ids, sent_at):
+        await self.collection.update_many(
+            {"_id": {"$in": [to_object_id(i) for i in ids]}},
+            {"$set": {"reminder_sent_at": sent_at}}
+        )
+
+    async def update_activity_schedule(self, activity_id, start_time, end_time):
+        await self.collection.update_many(
+            {"activity_id": activity_id},
+            {"$set": {"activity_start_time": start_time, "activity_end_time": end_time, "reminder_sent_at": None}}
+        )
+
+
+class MongoIdempotencyRepository(IdempotencyRepository):
+    def __init__(self, database):
+        self.collection = database.idempotency_keys
+
+    async def get(self, id):
+        return await self.collection.find_one({"_id": id})
+
+    async def insert(self, doc):
+        await self.collection.insert_one(doc)
+
+    async def replace(self, doc):
+        await self.collection.replace_one({"_id": doc["_id"]}, doc, upsert=True)
+
+    async def delete(self, id, status):
+        await self.collection.delete_one({"_id": id, "status": status})
+
+    async def touch(self, id, status, created_at, new_created_at):
+        result = await self.collection.update_one(
+            {"_id": id, "status": status, "created_at": created_at},
+            {"$set": {"created_at": new_created_at}}
+        )
+        return result.modified_count
+
+
+class MongoStorage(Storage):
+    def __init__(self, database):
+        self.activities = MongoActivityRepository(database)
+        self.users = MongoUserRepository(database)
+        self.reservations = MongoReservationRepository(database)
+        self.idempotency = MongoIdempotencyRepository(database)
@@ -1,10 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from backend.core.config import settings
-from passlib.context import CryptContext
-from datetime import datetime, timezone
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class DataBase:
     client: AsyncIOMotorClient = None
 
@@ -14,7 +9,11 @@ async def get_database():
     return db.client[settings.DATABASE_NAME]
 
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    # Sin primario, el driver se rinde en el mismo plazo que las operaciones (no 30 s)
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        serverSelectionTimeoutMS=int(settings.DB_TIMEOUT_SECONDS * 1000)
+    )
     print(f"Connected to MongoDB: {settings.DATABASE_NAME}")
     
     database = db.client[settings.DATABASE_NAME]
@@ -29,23 +28,29 @@ async def connect_to_mongo():
         unique=True,
         partialFilterExpression={"status": "active"}
     )
-    print("Indexes created.")
 
-    # --- Default admin seed ---
-    DEFAULT_ADMIN_EMAIL = "admin@admin.com"
-    existing_admin = await database.users.find_one({"email": DEFAULT_ADMIN_EMAIL})
-    if not existing_admin:
-        hashed_password = pwd_context.hash("admin")
-        await database.users.insert_one({
-            "email":           DEFAULT_ADMIN_EMAIL,
-            "full_name":       "Administrador",
-            "role":            "admin",
-            "hashed_password": hashed_password,
-            "created_at":      datetime.now(timezone.utc),
-        })
-        print(f"✅ Admin por defecto creado: {DEFAULT_ADMIN_EMAIL} / admin")
-    else:
-        print(f"ℹ️  Admin por defecto ya existe: {DEFAULT_ADMIN_EMAIL}")
+    # Schedule conflict lookups (location / instructor / member)
+    await database.activities.create_index([("location", 1), ("start_time", 1)])
+    await database.activities.create_index([("instructor", 1), ("start_time", 1)])
+    await database.reservations.create_index(
+        [("user_id", 1), ("status", 1), ("activity_start_time", 1)]
+    )
+
+    # Catalog search: relevance (text) and prefix (keywords) lookups
+    await database.activities.create_index(
+        [("title", "text"), ("description", "text"), ("instructor", "text"), ("location", "text")],
+        weights={"title": 10, "instructor": 5, "location": 3, "description": 1},
+        default_language="spanish",
+        name="activities_text"
+    )
+    await database.activities.create_index([("keywords", 1), ("start_time", 1)])
+
+    # Reminder dispatcher: upcoming active reservations by start time
+    await database.reservations.create_index([("status", 1), ("activity_start_time", 1)])
+
+    # Idempotency-Key responses expire automatically
+    await database.idempotency_keys.create_index("created_at", expireAfterSeconds=settings.IDEMPOTENCY_TTL_SECONDS)
+    print("Indexes created.")
 
 async def close_mongo_connection():
     db.client.close()
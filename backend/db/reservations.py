@@ -1,22 +1,48 @@
-from backend.db.mongodb import get_database
+from backend.db.storage import get_storage
+from backend.db.base import to_object_id, to_naive_utc
+from backend.db.resilience import DatabaseUnavailable
+from backend.core.reminders import reminder_scheduled, reminder_cancelled
 from backend.models.reservation import ReservationStatus, ReservationCreate
-from backend.models.activity import ActivityInDB
-from bson import ObjectId
 from datetime import datetime
-from pymongo import ReturnDocument
+from typing import Optional
+
+async def find_member_overlap(user_id: str, start_time: datetime, end_time: datetime, exclude_id=None):
+    """
+    Devuelve una reserva activa del usuario que se solape con [start_time, end_time).
+    Usa el índice (user_id, status, activity_start_time): como no se permiten
+    reservas solapadas, basta con la primera que empieza dentro del rango y la
+    última que empieza antes.
+    """
+    storage = get_storage()
+
+    inside = await storage.reservations.first_active_starting_between(user_id, start_time, end_time, exclude_id)
+    if inside:
+        return inside
+
+    previous = await storage.reservations.last_active_starting_before(user_id, start_time, exclude_id)
+    if not previous:
+        return None
+
+    prev_end = previous.get("activity_end_time")
+    if prev_end is None:
+        # Reservas antiguas sin hora de fin: consultarla en la actividad
+        act = await storage.activities.get(previous["activity_id"])
+        prev_end = act["end_time"] if act else None
+
+    if prev_end and to_naive_utc(prev_end) > to_naive_utc(start_time):
+        return previous
+    return None
 
 async def create_reservation_db(user_id: str, reservation_create: ReservationCreate):
-    db = await get_database()
+    storage = get_storage()
     activity_id = reservation_create.activity_id
 
-    try:
-        act_oid = ObjectId(activity_id)
-        user_oid = ObjectId(user_id)
-    except:
+    act_oid = to_object_id(activity_id)
+    if act_oid is None or to_object_id(user_id) is None:
         return None, "Invalid ID format"
 
-    # 1. Check Capacity & Increment (Atomic Operation)
-    activity = await db.activities.find_one({"_id": act_oid})
+    # 1. Check Capacity
+    activity = await storage.activities.get(act_oid)
     if not activity:
         return None, "Activity not found"
         
@@ -24,49 +50,73 @@ async def create_reservation_db(user_id: str, reservation_create: ReservationCre
         return None, "Activity is full"
 
     # 2. Check for duplicate reservation
-    existing = await db.reservations.find_one({
-        "user_id": user_id,
-        "activity_id": activity_id,
-        "status": ReservationStatus.ACTIVE
-    })
+    existing = await storage.reservations.find_active(user_id, activity_id)
     if existing:
         return None, "You already have an active reservation"
 
-    # 3. Create Reservation
+    # 2b. Check the member is not double-booked at the same time
+    overlapping = await find_member_overlap(user_id, activity["start_time"], activity["end_time"])
+    if overlapping:
+        return None, f"You already have a reservation at that time: {overlapping.get('activity_title', 'Unknown')}"
+
+    # 3. Take a spot (atomic: only if booked_count < capacity)
+    if not await storage.activities.book_spot(act_oid):
+        return None, "Activity is full"
+
+    # 4. Create Reservation
     reservation_doc = {
         "user_id": user_id,
         "activity_id": activity_id,
         "activity_title": activity.get("title", "Unknown"),
         "activity_start_time": activity.get("start_time"),
+        "activity_end_time": activity.get("end_time"),
         "status": ReservationStatus.ACTIVE,
         "created_at": datetime.utcnow()
     }
 
     try:
-        # Insert reservation first
-        res_result = await db.reservations.insert_one(reservation_doc)
-        
-        # If successful, increment activity counter
-        await db.activities.update_one(
-            {"_id": act_oid},
-            {"$inc": {"booked_count": 1}}
-        )
-        
-        return str(res_result.inserted_id), None
-        
+        inserted_id = await storage.reservations.insert(reservation_doc)
+    except DatabaseUnavailable:
+        # No se sabe si la reserva se guardó: devolver la plaza podría sobrevender.
+        # booked_count se corrige con `init_db.py --reconcile`
+        raise
     except Exception as e:
+        # Give the spot back if the reservation could not be stored
+        await storage.activities.release_spot(act_oid)
         return None, f"Reservation failed: {str(e)}"
 
+    # 5. Re-check: a concurrent booking by the same member may also have passed step 2b.
+    #    Both see each other and roll back, so an overlap is never kept.
+    overlapping = await find_member_overlap(user_id, activity["start_time"], activity["end_time"], exclude_id=inserted_id)
+    if overlapping:
+        await storage.reservations.delete(inserted_id)
+        await storage.activities.release_spot(act_oid)
+        return None, f"You already have a reservation at that time: {overlapping.get('activity_title', 'Unknown')}"
+
+    reminder_scheduled(str(inserted_id), reservation_doc["activity_start_time"])
+    return str(inserted_id), None
+
+async def find_applied_reservation(user_id: str, activity_id: str):
+    """
+    Reserva activa que dejó guardada un intento anterior con la misma
+    Idempotency-Key (la inserción agotó el plazo pero se aplicó).
+    """
+    existing = await get_storage().reservations.find_active(user_id, activity_id)
+    if existing:
+        existing["_id"] = str(existing["_id"])
+        # El intento anterior no llegó a programar el aviso
+        reminder_scheduled(existing["_id"], existing["activity_start_time"])
+    return existing
+
 async def cancel_reservation_db(reservation_id: str, user_id: str):
-    db = await get_database()
+    storage = get_storage()
     
-    try:
-        res_oid = ObjectId(reservation_id)
-    except:
+    res_oid = to_object_id(reservation_id)
+    if res_oid is None:
         return None, "Invalid ID"
         
     # 1. Get Reservation
-    reservation = await db.reservations.find_one({"_id": res_oid})
+    reservation = await storage.reservations.get(res_oid)
     if not reservation:
         return None, "Reservation not found"
         
@@ -78,12 +128,7 @@ async def cancel_reservation_db(reservation_id: str, user_id: str):
         return None, "Reservation is not active"
 
     # 2. Get Activity Time
-    try:
-        act_oid = ObjectId(reservation["activity_id"])
-        activity = await db.activities.find_one({"_id": act_oid})
-    except:
-        return None, "Activity not found"
-    
+    activity = await storage.activities.get(reservation["activity_id"])
     if not activity:
         return None, "Activity not found"
 
@@ -105,68 +150,62 @@ async def cancel_reservation_db(reservation_id: str, user_id: str):
         release_spot = False 
         message = "Late cancellation. Spot not released."
         
-    # 4. Update Reservation Status
-    await db.reservations.update_one(
-        {"_id": res_oid},
-        {"$set": {"status": new_status}}
-    )
+    # 4. Update Reservation Status (only if still active, so a spot is never released twice)
+    updated = await storage.reservations.set_status(res_oid, new_status, expected_status=ReservationStatus.ACTIVE)
+    if not updated:
+        return None, "Reservation is not active"
+    reminder_cancelled(reservation_id)
     
     # 5. Update Activity Count
     if release_spot:
-        await db.activities.update_one(
-            {"_id": act_oid},
-            {"$inc": {"booked_count": -1}}
-        )
+        await storage.activities.release_spot(activity["_id"])
         
     return {"status": new_status, "message": message}, None
 
-async def get_user_reservations(user_id: str):
-    db = await get_database()
-    reservations = []
-    cursor = db.reservations.find({"user_id": user_id}).sort("activity_start_time", -1)
-    async for doc in cursor:
+async def get_user_reservations(user_id: str, projection: Optional[dict] = None):
+    reservations = await get_storage().reservations.list_by_user(user_id, projection)
+    for doc in reservations:
         doc["_id"] = str(doc["_id"])
-        reservations.append(doc)
     return reservations
 
 async def get_activity_reservations(activity_id: str):
-    db = await get_database()
-    reservations = []
+    storage = get_storage()
     
     # Get all relevant reservations
-    cursor = db.reservations.find({
-        "activity_id": activity_id,
-        "status": {"$in": ["active", "late_cancelled", "attended", "absent"]}
-    })
+    reservations = await storage.reservations.list_by_activity(
+        activity_id, ["active", "late_cancelled", "attended", "absent"]
+    )
+
+    # Hydrate with user details (one query for all attendees)
+    users = await storage.users.get_many(
+        [doc["user_id"] for doc in reservations], {"full_name": 1, "email": 1}
+    )
+    users_by_id = {str(user["_id"]): user for user in users}
     
-    async for doc in cursor:
+    for doc in reservations:
         doc["_id"] = str(doc["_id"])
-        
-        # Hydrate with user details manually (simple join)
-        try:
-            user_oid = ObjectId(doc["user_id"])
-            user = await db.users.find_one({"_id": user_oid}, {"full_name": 1, "email": 1})
-            if user:
-                doc["user_name"] = user.get("full_name", "Unknown")
-                doc["user_email"] = user.get("email", "Unknown")
-        except:
+        user = users_by_id.get(doc["user_id"])
+        if user:
+            doc["user_name"] = user.get("full_name", "Unknown")
+            doc["user_email"] = user.get("email", "Unknown")
+        else:
             doc["user_name"] = "Unknown"
-        
-        reservations.append(doc)
     return reservations
 
 async def update_attendance_db(reservation_id: str, status: str):
-    db = await get_database()
-    try:
-        res_oid = ObjectId(reservation_id)
-    except:
+    res_oid = to_object_id(reservation_id)
+    if res_oid is None:
         return False
         
     if status not in [ReservationStatus.ATTENDED, ReservationStatus.ABSENT, ReservationStatus.ACTIVE]:
         return False
 
-    result = await db.reservations.update_one(
-        {"_id": res_oid},
-        {"$set": {"status": status}}
-    )
-    return result.modified_count > 0
+    storage = get_storage()
+    modified_count = await storage.reservations.set_status(res_oid, status)
+    if modified_count:
+        if status == ReservationStatus.ACTIVE:
+            reservation = await storage.reservations.get(res_oid)
+            reminder_scheduled(reservation_id, reservation["activity_start_time"])
+        else:
+            reminder_cancelled(reservation_id)
+    return modified_count > 0
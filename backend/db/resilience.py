@@ -0,0 +1,183 @@
+"""
+Protección frente a un Mongo lento o caído.
+
+- Cada operación de repositorio tiene un plazo (DB_TIMEOUT_SECONDS, o el de
+  DB_OPERATION_TIMEOUTS["repo.método"]). Se aplica con pymongo.timeout(), así
+  que es el propio driver (y el servidor, vía maxTimeMS) quien abandona la
+  operación: no quedan hilos de Motor ni conexiones bloqueadas.
+- Tras CIRCUIT_FAILURE_THRESHOLD timeouts / errores de conexión seguidos en
+  lecturas el circuito se abre: durante CIRCUIT_RESET_SECONDS las llamadas
+  fallan al instante con DatabaseUnavailable (503). Después se deja pasar una
+  lectura de prueba; si responde, el circuito se cierra.
+- Las escrituras solo se permiten con el circuito cerrado y no cuentan para
+  el circuito. Un timeout en una escritura no dice si se aplicó o no: se
+  propaga como DatabaseUnavailable y quien llama no debe compensar.
+- Modo degradado: las lecturas del catálogo guardan la última respuesta
+  buena (read_with_snapshot) y, si la BD no está disponible, la sirven con
+  las cabeceras `Age` y `X-Data-Stale`.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+import pymongo
+from fastapi import Response
+from pymongo.errors import ConnectionFailure, PyMongoError
+from backend.core.config import settings
+from backend.db.base import Storage
+
+
+# Métodos de repositorio que modifican datos (no reintentables a ciegas)
+WRITE_METHODS = {
+    "insert", "insert_many", "update", "delete", "book_spot", "release_spot", "set_status",
+    "mark_reminded", "update_activity_schedule", "replace", "touch",
+}
+
+def is_unavailable_error(error: Exception):
+    # Plazo agotado (servidor, red o selección de servidor) o sin conexión
+    return isinstance(error, ConnectionFailure) or (isinstance(error, PyMongoError) and error.timeout)
+
+
+class DatabaseUnavailable(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Database unavailable")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 1
+        return max(1, math.ceil(self.reset_seconds - (time.monotonic() - self.opened_at)))
+
+    def check_closed(self):
+        """Para escrituras: solo con el circuito cerrado, sin hacer de llamada de prueba."""
+        if self.state != "closed":
+            raise DatabaseUnavailable(self.retry_after())
+
+    def before_call(self):
+        """Lanza DatabaseUnavailable si no se puede llamar; True si es la llamada de prueba."""
+        state = self.state
+        if state == "open" or (state == "half_open" and self.probing):
+            raise DatabaseUnavailable(self.retry_after())
+        if state == "half_open":
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            print("🟢 Base de datos disponible de nuevo, circuito cerrado")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"🔴 {self.failures} fallos seguidos de la base de datos, circuito abierto")
+            self.opened_at = time.monotonic()
+
+
+class ResilientRepository:
+    """Envuelve los métodos async de un repositorio con plazo y circuit breaker."""
+
+    def __init__(self, name: str, repository, breaker: CircuitBreaker):
+        self._name = name
+        self._repository = repository
+        self._breaker = breaker
+
+    def __getattr__(self, attr):
+        method = getattr(self._repository, attr)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+        timeout = settings.DB_OPERATION_TIMEOUTS.get(f"{self._name}.{attr}", settings.DB_TIMEOUT_SECONDS)
+        breaker = self._breaker
+        name = f"{self._name}.{attr}"
+
+        async def write(*args, **kwargs):
+            breaker.check_closed()
+            try:
+                with pymongo.timeout(timeout):
+                    return await method(*args, **kwargs)
+            except PyMongoError as e:
+                if not is_unavailable_error(e):
+                    raise
+                # Resultado desconocido: puede haberse aplicado en el servidor
+                print(f"⚠️  {name}: {type(e).__name__} (escritura sin confirmar)")
+                raise DatabaseUnavailable(breaker.retry_after()) from e
+
+        async def read(*args, **kwargs):
+            probe = breaker.before_call()
+            try:
+                with pymongo.timeout(timeout):
+                    result = await method(*args, **kwargs)
+            except PyMongoError as e:
+                if not is_unavailable_error(e):
+                    # Error de la consulta: la BD ha respondido
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                print(f"⚠️  {name}: {type(e).__name__}")
+                raise DatabaseUnavailable(breaker.retry_after()) from e
+            finally:
+                if probe:
+                    breaker.probing = False
+            breaker.record_success()
+            return result
+
+        return write if attr in WRITE_METHODS else read
+
+
+class ResilientStorage(Storage):
+    def __init__(self, storage: Storage):
+        self.breaker = CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_SECONDS)
+        self.activities = ResilientRepository("activities", storage.activities, self.breaker)
+        self.users = ResilientRepository("users", storage.users, self.breaker)
+        self.reservations = ResilientRepository("reservations", storage.reservations, self.breaker)
+        self.idempotency = ResilientRepository("idempotency", storage.idempotency, self.breaker)
+
+
+# --- Última respuesta buena de las lecturas del catálogo (LRU) ---
+SNAPSHOT_MAX_ITEMS = 512
+_snapshots: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+async def read_with_snapshot(key: tuple, response: Response, load):
+    """
+    Ejecuta `load()` y guarda el resultado. Si la BD no está disponible y hay
+    una copia anterior para `key`, la devuelve marcada como obsoleta.
+    """
+    try:
+        result = await load()
+    except DatabaseUnavailable:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            raise
+        stored_at, result = snapshot
+        response.headers["Age"] = str(int(time.monotonic() - stored_at))
+        response.headers["X-Data-Stale"] = "true"
+        return result
+
+    _snapshots[key] = (time.monotonic(), result)
+    _snapshots.move_to_end(key)
+    while len(_snapshots) > SNAPSHOT_MAX_ITEMS:
+        _snapshots.popitem(last=False)
+    return result
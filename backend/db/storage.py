@@ -0,0 +1,32 @@
+from backend.core.config import settings
+from backend.db.base import Storage
+from backend.db.memory_storage import MemoryStorage
+from backend.db.mongo_storage import MongoStorage
+from backend.db.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from backend.db.resilience import ResilientStorage
+
+class StorageHolder:
+    storage: Storage = None
+
+holder = StorageHolder()
+
+def get_storage() -> Storage:
+    return holder.storage
+
+async def init_storage():
+    # STORAGE_BACKEND=memory → API completa sin Mongo (tests, benchmarks)
+    if settings.STORAGE_BACKEND == "memory":
+        holder.storage = MemoryStorage()
+        print("Using in-memory storage")
+    else:
+        if not settings.MONGODB_URL:
+            raise RuntimeError("MONGODB_URL is required when STORAGE_BACKEND=mongo")
+        await connect_to_mongo()
+        # Plazos y circuit breaker alrededor de cada llamada a Mongo
+        holder.storage = ResilientStorage(MongoStorage(await get_database()))
+    return holder.storage
+
+async def close_storage():
+    if isinstance(holder.storage, ResilientStorage):
+        await close_mongo_connection()
+    holder.storage = None
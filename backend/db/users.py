@@ -1,17 +1,31 @@
-from backend.db.mongodb import get_database
+from backend.db.storage import get_storage
+from backend.db.base import to_object_id
 from backend.models.user import UserCreate
 from backend.core.security import get_password_hash
-from datetime import datetime
-from bson import ObjectId
+from datetime import datetime, timezone
+from typing import Optional
+
+DEFAULT_ADMIN_EMAIL = "admin@admin.com"
+
+async def ensure_default_admin():
+    existing_admin = await get_user_by_email(DEFAULT_ADMIN_EMAIL)
+    if not existing_admin:
+        await get_storage().users.insert({
+            "email":           DEFAULT_ADMIN_EMAIL,
+            "full_name":       "Administrador",
+            "role":            "admin",
+            "hashed_password": get_password_hash("admin"),
+            "created_at":      datetime.now(timezone.utc),
+        })
+        print(f"✅ Admin por defecto creado: {DEFAULT_ADMIN_EMAIL} / admin")
+    else:
+        print(f"ℹ️  Admin por defecto ya existe: {DEFAULT_ADMIN_EMAIL}")
 
 async def get_user_by_email(email: str):
-    db = await get_database()
-    user = await db.users.find_one({"email": email})
+    user = await get_storage().users.get_by_email(email)
     return user
 
 async def create_user(user: UserCreate):
-    db = await get_database()
-    
     # 1. Check if user exists
     existing_user = await get_user_by_email(user.email)
     if existing_user:
@@ -30,15 +44,15 @@ async def create_user(user: UserCreate):
     }
     
     # 4. Insert
-    result = await db.users.insert_one(user_doc)
-    return result.inserted_id
+    return await get_storage().users.insert(user_doc)
 
-async def get_all_users():
-    db = await get_database()
+async def get_all_users(projection: Optional[dict] = None):
     users = []
-    # Sort by created_at desc (newest first)
-    cursor = db.users.find().sort("created_at", -1)
-    async for doc in cursor:
+    # Never read the password hash
+    if projection is None:
+        projection = {"hashed_password": 0}
+    # Sorted by created_at desc (newest first)
+    for doc in await get_storage().users.list(projection):
         # Map _id to id for Pydantic
         doc["id"] = str(doc["_id"])
         
@@ -52,11 +66,9 @@ async def get_all_users():
     return users
 
 async def delete_user_db(user_id: str):
-    db = await get_database()
-    try:
-        obj_id = ObjectId(user_id)
-    except:
+    obj_id = to_object_id(user_id)
+    if obj_id is None:
         return False
         
-    result = await db.users.delete_one({"_id": obj_id})
-    return result.deleted_count > 0
+    deleted_count = await get_storage().users.delete(obj_id)
+    return deleted_count > 0
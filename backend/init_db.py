@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 dotenv_path = os.path.join(base_dir, ".env")
 load_dotenv(dotenv_path)
+sys.path.append(base_dir)
+
+from backend.core.search import build_search_keywords
 
 # Obtener URL
 MONGODB_URL = os.getenv("MONGODB_URL")
@@ -18,7 +21,71 @@ if not MONGODB_URL:
 # Nombre de la BD (extraído de la URL o default)
 DB_NAME = "gym_db"
 
-async def init_db(reset=False):
+# Estados de reserva que ocupan plaza (booked_count)
+HOLDS_SPOT = ["active", "late_cancelled", "attended", "absent"]
+
+async def reconcile_booked_counts(db):
+    """
+    Recalcula booked_count a partir de las reservas. Tras una caída de Mongo
+    una reserva con resultado desconocido puede dejar el contador desfasado.
+    Solo con --reconcile y con la API parada: una reserva o cancelación entre
+    la agregación y la corrección se perdería. Cada corrección solo se aplica
+    si booked_count sigue valiendo lo que se leyó.
+    """
+    counts = {}
+    pipeline = [
+        {"$match": {"status": {"$in": HOLDS_SPOT}}},
+        {"$group": {"_id": "$activity_id", "count": {"$sum": 1}}},
+    ]
+    async for row in db.reservations.aggregate(pipeline):
+        counts[row["_id"]] = row["count"]
+
+    fixed = 0
+    async for act in db.activities.find({}, {"booked_count": 1}):
+        count = counts.get(str(act["_id"]), 0)
+        if act.get("booked_count", 0) != count:
+            result = await db.activities.update_one(
+                {"_id": act["_id"], "booked_count": act.get("booked_count")},
+                {"$set": {"booked_count": count}}
+            )
+            fixed += result.modified_count
+    return fixed
+
+async def report_schedule_overlaps(db):
+    """
+    La detección de solapes de la API asume que nunca se han guardado dos
+    clases solapadas en la misma sala / con el mismo monitor, ni dos reservas
+    activas solapadas del mismo socio. Lista los casos que lo incumplen (datos
+    anteriores a la validación) para corregirlos a mano; no borra nada.
+    """
+    found = 0
+
+    async def scan(cursor, group_key, start_key, end_key, describe):
+        nonlocal found
+        last_group, last_end, last_doc = None, None, None
+        async for doc in cursor:
+            start, end = doc.get(start_key), doc.get(end_key)
+            if start is None or end is None:
+                continue
+            if doc.get(group_key) == last_group and start < last_end:
+                print(f"   ⚠️  {describe(last_doc, doc)}")
+                found += 1
+            if doc.get(group_key) != last_group or end > last_end:
+                last_group, last_end, last_doc = doc.get(group_key), end, doc
+
+    for field in ("location", "instructor"):
+        cursor = db.activities.find({}, {field: 1, "title": 1, "start_time": 1, "end_time": 1}) \
+            .sort([(field, 1), ("start_time", 1)])
+        await scan(cursor, field, "start_time", "end_time", lambda a, b, field=field:
+            f"{field} '{b[field]}': '{a.get('title')}' y '{b.get('title')}' se solapan ({b['start_time']:%Y-%m-%d %H:%M})")
+
+    cursor = db.reservations.find({"status": "active"}) \
+        .sort([("user_id", 1), ("activity_start_time", 1)])
+    await scan(cursor, "user_id", "activity_start_time", "activity_end_time", lambda a, b:
+        f"socio {b['user_id']}: reservas {a['_id']} y {b['_id']} se solapan ({b['activity_start_time']:%Y-%m-%d %H:%M})")
+    return found
+
+async def init_db(reset=False, reconcile=False):
     print(f"🔌 Conectando a MongoDB...")
     client = AsyncIOMotorClient(MONGODB_URL)
     db = client[DB_NAME]
@@ -52,10 +119,51 @@ async def init_db(reset=False):
     await db.activities.create_index("start_time")
     print("   👉 Índice creado: activities.start_time")
 
+    # Detección de solapes: misma sala o mismo monitor a la vez
+    await db.activities.create_index([("location", 1), ("start_time", 1)])
+    await db.activities.create_index([("instructor", 1), ("start_time", 1)])
+    print("   👉 Índices creados: activities (location + start_time), (instructor + start_time)")
+
+    # Un socio no puede tener dos reservas activas solapadas
+    await db.reservations.create_index([("user_id", 1), ("status", 1), ("activity_start_time", 1)])
+    print("   👉 Índice creado: reservations (user_id + status + activity_start_time)")
+
+    # Recordatorios: reservas activas próximas por hora de inicio
+    await db.reservations.create_index([("status", 1), ("activity_start_time", 1)])
+    print("   👉 Índice creado: reservations (status + activity_start_time)")
+
+    # Búsqueda en el catálogo: texto (relevancia) y keywords (prefijos)
+    await db.activities.create_index(
+        [("title", "text"), ("description", "text"), ("instructor", "text"), ("location", "text")],
+        weights={"title": 10, "instructor": 5, "location": 3, "description": 1},
+        default_language="spanish",
+        name="activities_text"
+    )
+    await db.activities.create_index([("keywords", 1), ("start_time", 1)])
+    print("   👉 Índices creados: activities (texto) y (keywords + start_time)")
+
+    # Rellenar keywords de actividades creadas antes de existir la búsqueda
+    updated = 0
+    async for doc in db.activities.find({"keywords": {"$exists": False}}):
+        await db.activities.update_one({"_id": doc["_id"]}, {"$set": {"keywords": build_search_keywords(doc)}})
+        updated += 1
+    if updated:
+        print(f"   👉 Keywords generadas para {updated} actividades existentes")
+
+    overlaps = await report_schedule_overlaps(db)
+    if overlaps:
+        print(f"   ❗ {overlaps} solapes guardados: corrígelos, la detección de conflictos asume que no existen")
+
+    if reconcile:
+        fixed = await reconcile_booked_counts(db)
+        print(f"   👉 booked_count corregido en {fixed} actividades")
+
     print("\n✅ Esquema de base de datos inicializado correctamente.")
     client.close()
 
 if __name__ == "__main__":
     # Si pasas el argumento --reset, borra todo antes
     reset_mode = "--reset" in sys.argv
-    asyncio.run(init_db(reset=reset_mode))
+    # --reconcile recalcula booked_count (solo con la API parada)
+    reconcile_mode = "--reconcile" in sys.argv
+    asyncio.run(init_db(reset=reset_mode, reconcile=reconcile_mode))
@@ -5,18 +5,27 @@ from contextlib import asynccontextmanager
 # Añadir el directorio raíz del proyecto al sys.path para que las importaciones de 'backend.' funcionen
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.db.mongodb import connect_to_mongo, close_mongo_connection
+from fastapi.middleware.gzip import GZipMiddleware
+from backend.db.storage import init_storage, close_storage, get_storage
+from backend.db.resilience import DatabaseUnavailable, ResilientStorage
+from backend.db.users import ensure_default_admin
+from backend.core.reminders import start_reminders, stop_reminders
 from backend.routes.auth import router as auth_router
 from backend.routes.activities import router as activities_router
 from backend.routes.reservations import router as reservations_router
+from backend.routes.dashboard import router as dashboard_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await connect_to_mongo()
+    await init_storage()
+    await ensure_default_admin()
+    start_reminders()
     yield
-    await close_mongo_connection()
+    await stop_reminders()
+    await close_storage()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -37,10 +46,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respuestas grandes (listados) para clientes móviles en redes lentas
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# BD caída o circuito abierto → 503 inmediato (escrituras y lecturas sin copia)
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database unavailable, try again later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(activities_router, prefix="/activities", tags=["activities"])
 app.include_router(reservations_router, prefix="/reservations", tags=["reservations"])
+app.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
 
 @app.get("/")
 async def root():
-    return {"message": "API Online", "db_status": "connected"}
+    storage = get_storage()
+    db_status = "connected"
+    if isinstance(storage, ResilientStorage) and storage.breaker.state != "closed":
+        db_status = "degraded"
+    return {"message": "API Online", "db_status": db_status}
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from backend.models.activity import ActivityInDB
+from backend.models.reservation import ReservationInDB, ReservationStatus
+from backend.models.user import UserResponse
+
+class DashboardActivity(ActivityInDB):
+    # Reserva del usuario en esta actividad (si la tiene)
+    my_reservation_id: Optional[str] = None
+    my_reservation_status: Optional[ReservationStatus] = None
+
+class Dashboard(BaseModel):
+    user: UserResponse
+    activities: List[DashboardActivity]
+    reservations: List[ReservationInDB]
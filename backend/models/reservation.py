@@ -25,6 +25,7 @@ class ReservationInDB(ReservationBase):
     # Optional: Embed basic activity info
     activity_title: Optional[str] = None
     activity_start_time: Optional[datetime] = None
+    activity_end_time: Optional[datetime] = None
 
     class Config:
         populate_by_name = True
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from typing import List, Optional
+from datetime import datetime
 from backend.models.activity import ActivityCreate, ActivityInDB, ActivityUpdate
-from backend.db.activities import create_activity, get_all_activities, get_activity, update_activity, delete_activity
+from backend.db.activities import create_activity, get_all_activities, get_activity, update_activity, delete_activity, validate_activity_batch, create_activities_bulk, search_activities, find_applied_activity, INVALID_SCHEDULE
+from backend.db.idempotency import begin_idempotent_request, complete_idempotent_request, abort_idempotent_request, idempotent_replay, is_completed, KEY_REUSED
 from backend.routes.auth import get_current_user
+from backend.db.resilience import read_with_snapshot, DatabaseUnavailable
+from backend.core.fieldsets import parse_fields, partial_response
 
 router = APIRouter()
 
@@ -16,27 +21,114 @@ async def get_current_admin(current_user: dict = Depends(get_current_user)):
     return current_user
 
 @router.get("/", response_model=List[ActivityInDB])
-async def list_activities(skip: int = 0, limit: int = 100):
-    activities = await get_all_activities(skip, limit)
+async def list_activities(response: Response, skip: int = 0, limit: int = 100, fields: Optional[str] = None):
+    # fields=title,start_time → solo se leen y serializan esos campos
+    projection = parse_fields(fields, ActivityInDB)
+    # Si Mongo no responde, se sirve la última copia buena (cabecera X-Data-Stale)
+    activities = await read_with_snapshot(
+        ("list", skip, limit, fields), response,
+        lambda: get_all_activities(skip, limit, projection)
+    )
+    if projection:
+        return partial_response(ActivityInDB, activities, projection)
+    return activities
+
+@router.get("/search", response_model=List[ActivityInDB])
+async def search_catalog(
+    response: Response,
+    q: Optional[str] = Query(None, max_length=100),
+    prefix: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    available: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+):
+    projection = parse_fields(fields, ActivityInDB)
+    activities = await read_with_snapshot(
+        ("search", q, prefix, date_from, date_to, available, skip, limit, fields), response,
+        lambda: search_activities(q, prefix, date_from, date_to, available, skip, limit, projection)
+    )
+    if projection:
+        return partial_response(ActivityInDB, activities, projection)
     return activities
 
 @router.post("/", response_model=ActivityInDB, status_code=status.HTTP_201_CREATED)
-async def create_new_activity(activity: ActivityCreate, current_user: dict = Depends(get_current_admin)):
-    activity_id = await create_activity(activity)
-    created_activity = await get_activity(activity_id)
+async def create_new_activity(
+    activity: ActivityCreate,
+    current_user: dict = Depends(get_current_admin),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    user_id = str(current_user["_id"])
+    scope = "POST /activities/"
+
+    # Reintentos con la misma Idempotency-Key reciben la primera respuesta
+    if idempotency_key:
+        record, error = await begin_idempotent_request(user_id, scope, idempotency_key, activity)
+        if error == KEY_REUSED:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=error)
+        if error:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+        if record and is_completed(record):
+            return idempotent_replay(record)
+        if record:
+            # El intento anterior no terminó: si la clase llegó a crearse, es la respuesta
+            existing = await find_applied_activity(activity)
+            if existing:
+                body = jsonable_encoder(ActivityInDB(**existing))
+                await complete_idempotent_request(user_id, scope, idempotency_key, activity, status.HTTP_201_CREATED, body)
+                return existing
+
+    try:
+        activity_id, error = await create_activity(activity)
+        created_activity = await get_activity(activity_id) if not error else None
+    except DatabaseUnavailable:
+        # La clase puede haberse creado: la clave sigue en curso hasta que un reintento la retome
+        raise
+    except Exception:
+        if idempotency_key:
+            await abort_idempotent_request(user_id, scope, idempotency_key)
+        raise
+
+    if error:
+        if idempotency_key:
+            await complete_idempotent_request(user_id, scope, idempotency_key, activity, status.HTTP_409_CONFLICT, {"detail": error})
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+
+    if idempotency_key:
+        body = jsonable_encoder(ActivityInDB(**created_activity))
+        await complete_idempotent_request(user_id, scope, idempotency_key, activity, status.HTTP_201_CREATED, body)
     return created_activity
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_activities_batch(activities: List[ActivityCreate], validate_only: bool = False, current_user: dict = Depends(get_current_admin)):
+    # Importación masiva / clases recurrentes: se valida todo el lote antes de insertar
+    errors = await validate_activity_batch(activities)
+    if errors:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=errors)
+    if validate_only or not activities:
+        return {"valid": True, "ids": []}
+    ids, errors = await create_activities_bulk(activities)
+    if errors:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=errors)
+    return {"valid": True, "ids": ids}
+
 @router.get("/{activity_id}", response_model=ActivityInDB)
-async def read_activity(activity_id: str):
-    activity = await get_activity(activity_id)
+async def read_activity(activity_id: str, response: Response):
+    activity = await read_with_snapshot(("get", activity_id), response, lambda: get_activity(activity_id))
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     return activity
 
 @router.put("/{activity_id}", response_model=ActivityInDB)
 async def update_existing_activity(activity_id: str, activity_update: ActivityUpdate, current_user: dict = Depends(get_current_admin)):
-    updated_count = await update_activity(activity_id, activity_update)
-    if updated_count == 0:
+    updated_count, error = await update_activity(activity_id, activity_update)
+    if error == INVALID_SCHEDULE:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=error)
+    if error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+    if not updated_count:
         # Check if it exists
         existing = await get_activity(activity_id)
         if not existing:
@@ -3,31 +3,37 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from backend.db.users import create_user, get_user_by_email, get_all_users, delete_user_db
 from backend.models.user import UserCreate, UserResponse
 from backend.core.security import verify_password, create_access_token, SECRET_KEY, ALGORITHM
+from backend.core.fieldsets import parse_fields, partial_response
 from jose import JWTError, jwt
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # --- Dependencies ---
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    # Una excepción nueva en cada raise: una compartida acumula tracebacks
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_access_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        if payload.get("sub") is None:
+            raise credentials_exception()
     except JWTError:
-        raise credentials_exception
-        
-    user = await get_user_by_email(email)
+        raise credentials_exception() from None
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = decode_access_token(token)
+    user = await get_user_by_email(payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
 async def get_current_admin(current_user: dict = Depends(get_current_user)):
@@ -71,7 +77,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     # 3. Create token
     access_token_expires = timedelta(minutes=60 * 24) # 24 horas para desarrollo
     access_token = create_access_token(
-        data={"sub": user["email"], "role": user["role"]},
+        data={"sub": user["email"], "role": user["role"], "uid": str(user["_id"])},
         expires_delta=access_token_expires
     )
     
@@ -82,8 +88,11 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
     return {**current_user, "id": str(current_user["_id"])}
 
 @router.get("/users", response_model=List[UserResponse])
-async def list_users(current_user: dict = Depends(get_current_admin)):
-    users = await get_all_users()
+async def list_users(fields: Optional[str] = None, current_user: dict = Depends(get_current_admin)):
+    projection = parse_fields(fields, UserResponse)
+    users = await get_all_users(projection)
+    if projection:
+        return partial_response(UserResponse, users, projection)
     return users
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
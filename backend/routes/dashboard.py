@@ -0,0 +1,54 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from backend.models.dashboard import Dashboard
+from backend.models.reservation import ReservationStatus
+from backend.db.activities import get_upcoming_activities
+from backend.db.reservations import get_user_reservations
+from backend.db.users import get_user_by_email
+from backend.routes.auth import oauth2_scheme, decode_access_token, credentials_exception
+
+router = APIRouter()
+
+@router.get("", response_model=Dashboard)
+async def read_dashboard(limit: int = Query(100, ge=1, le=100), token: str = Depends(oauth2_scheme)):
+    payload = decode_access_token(token)
+    user_id = payload.get("uid")
+
+    if user_id:
+        # El token ya trae el id: usuario, actividades y reservas en paralelo
+        user, activities, reservations = await asyncio.gather(
+            get_user_by_email(payload["sub"]),
+            get_upcoming_activities(limit),
+            get_user_reservations(user_id),
+        )
+        if user is None or str(user["_id"]) != user_id:
+            raise credentials_exception()
+    else:
+        # Tokens antiguos sin "uid": primero el usuario
+        user = await get_user_by_email(payload["sub"])
+        if user is None:
+            raise credentials_exception()
+        user_id = str(user["_id"])
+        activities, reservations = await asyncio.gather(
+            get_upcoming_activities(limit),
+            get_user_reservations(user_id),
+        )
+
+    # Una reserva activa tiene prioridad sobre las canceladas/antiguas
+    by_activity = {}
+    for res in reservations:
+        current = by_activity.get(res["activity_id"])
+        if current is None or res["status"] == ReservationStatus.ACTIVE:
+            by_activity[res["activity_id"]] = res
+
+    for act in activities:
+        res = by_activity.get(act["_id"])
+        if res:
+            act["my_reservation_id"] = res["_id"]
+            act["my_reservation_status"] = res["status"]
+
+    return {
+        "user": {**user, "id": str(user["_id"])},
+        "activities": activities,
+        "reservations": reservations,
+    }
@@ -1,21 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from typing import List, Optional
 from backend.models.reservation import ReservationCreate, ReservationInDB, ReservationAttendance, AttendanceUpdate
-from backend.db.reservations import create_reservation_db, cancel_reservation_db, get_user_reservations, get_activity_reservations, update_attendance_db
+from backend.db.reservations import create_reservation_db, find_applied_reservation, cancel_reservation_db, get_user_reservations, get_activity_reservations, update_attendance_db
+from backend.db.idempotency import begin_idempotent_request, complete_idempotent_request, abort_idempotent_request, idempotent_replay, is_completed, KEY_REUSED
+from backend.db.resilience import DatabaseUnavailable
 from backend.routes.auth import get_current_user, get_current_admin
+from backend.core.fieldsets import parse_fields, partial_response
 
 router = APIRouter()
 
 @router.post("/", response_model=ReservationInDB, status_code=status.HTTP_201_CREATED)
-async def create_reservation(reservation: ReservationCreate, current_user: dict = Depends(get_current_user)):
-    res_id, error = await create_reservation_db(str(current_user["_id"]), reservation)
+async def create_reservation(
+    reservation: ReservationCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+):
+    user_id = str(current_user["_id"])
+    scope = "POST /reservations/"
+
+    # Reintentos con la misma Idempotency-Key reciben la primera respuesta
+    if idempotency_key:
+        record, error = await begin_idempotent_request(user_id, scope, idempotency_key, reservation)
+        if error == KEY_REUSED:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=error)
+        if error:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error)
+        if record and is_completed(record):
+            return idempotent_replay(record)
+        if record:
+            # El intento anterior no terminó: si la reserva llegó a guardarse, es la respuesta
+            existing = await find_applied_reservation(user_id, reservation.activity_id)
+            if existing:
+                result = ReservationInDB(**existing)
+                await complete_idempotent_request(user_id, scope, idempotency_key, reservation, status.HTTP_201_CREATED, jsonable_encoder(result))
+                return result
+
+    try:
+        res_id, error = await create_reservation_db(user_id, reservation)
+    except DatabaseUnavailable:
+        # La reserva puede haberse guardado: la clave sigue en curso hasta que un reintento la retome
+        raise
+    except Exception:
+        if idempotency_key:
+            await abort_idempotent_request(user_id, scope, idempotency_key)
+        raise
+
     if error:
+        if idempotency_key:
+            await complete_idempotent_request(user_id, scope, idempotency_key, reservation, 400, {"detail": error})
         raise HTTPException(status_code=400, detail=error)
-    return {**reservation.dict(), "id": res_id, "user_id": str(current_user["_id"]), "status": "active"}
+
+    result = ReservationInDB(**{**reservation.dict(), "id": res_id, "user_id": user_id, "status": "active"})
+    if idempotency_key:
+        await complete_idempotent_request(user_id, scope, idempotency_key, reservation, status.HTTP_201_CREATED, jsonable_encoder(result))
+    return result
 
 @router.get("/me", response_model=List[ReservationInDB])
-async def read_my_reservations(current_user: dict = Depends(get_current_user)):
-    reservations = await get_user_reservations(str(current_user["_id"]))
+async def read_my_reservations(fields: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    projection = parse_fields(fields, ReservationInDB)
+    reservations = await get_user_reservations(str(current_user["_id"]), projection)
+    if projection:
+        return partial_response(ReservationInDB, reservations, projection)
     return reservations
 
 @router.put("/{reservation_id}/cancel")
@@ -0,0 +1,258 @@
+"""
+Generador de datos sintéticos para pruebas de rendimiento.
+Crea N socios, M actividades repartidas en un rango de fechas y un historial
+de reservas/asistencia realista, con inserciones por lotes (insert_many).
+Ejecutar desde la raíz del proyecto con el venv activado:
+    python backend/seed_data.py --members 100000 --activities 20000 --days 90 --seed 42
+
+Los datos son deterministas para un mismo --seed. Todos los socios tienen la
+misma contraseña (--password), hasheada una única vez.
+
+Las actividades y reservas generadas llevan el campo `seed` y los socios un
+email @seedN.gym: --reset solo borra eso, nunca datos reales ni índices.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Añadir la raíz del proyecto al path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+
+# Cargar .env desde la raíz del proyecto
+env_path = Path(__file__).resolve().parent.parent / ".env"
+load_dotenv(env_path)
+
+from backend.core.security import get_password_hash
+from backend.core.search import build_search_keywords
+
+MONGODB_URL = os.getenv("MONGODB_URL")
+DB_NAME = "gym_db"
+
+TITLES = ["Yoga", "Pilates", "Spinning", "Crossfit", "Zumba", "Body Pump", "HIIT", "Boxeo", "Natación", "Estiramientos"]
+ADJECTIVES = ["Suave", "Intenso", "Principiantes", "Avanzado", "Express", "Matinal", "Nocturno"]
+LOCATIONS = ["Sala 1", "Sala 2", "Sala 3", "Sala Ciclo", "Piscina", "Exterior"]
+INSTRUCTORS = ["Ana", "Bruno", "Carla", "David", "Elena", "Fernando", "Gloria", "Hugo", "Irene", "Javier"]
+FIRST_NAMES = ["Lucía", "Mateo", "Sofía", "Hugo", "Martina", "Leo", "Julia", "Daniel", "Valeria", "Pablo"]
+LAST_NAMES = ["García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Ruiz", "Díaz", "Moreno", "Álvarez"]
+
+# Franjas horarias de 1h: 7:00 → 21:00
+FIRST_HOUR = 7
+HOURS_PER_DAY = 15
+
+# Estado final de una reserva pasada / futura (pesos)
+PAST_STATUSES = (["attended", "absent", "late_cancelled", "cancelled"], [70, 10, 8, 12])
+FUTURE_STATUSES = (["active", "cancelled"], [90, 10])
+# Estados que ocupan plaza (booked_count)
+HOLDS_SPOT = {"active", "attended", "absent", "late_cancelled"}
+
+
+def new_id(rng: random.Random):
+    # ObjectId derivado de la semilla para que los datos sean reproducibles
+    return ObjectId(rng.getrandbits(96).to_bytes(12, "big"))
+
+
+class Stats:
+    def __init__(self):
+        self.counts = {}
+        self.elapsed = {}
+        self.start = time.perf_counter()
+
+    def add(self, collection: str, n: int):
+        self.counts[collection] = self.counts.get(collection, 0) + n
+
+    def add_time(self, collection: str, seconds: float):
+        self.elapsed[collection] = self.elapsed.get(collection, 0) + seconds
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        total = sum(self.counts.values())
+        print(f"\n📊 {total:,} documentos en {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} docs/s)")
+        for collection, n in self.counts.items():
+            seconds = self.elapsed.get(collection, 0)
+            print(f"   👉 {collection}: {n:,} en {seconds:.1f}s ({n / max(seconds, 1e-9):,.0f} docs/s)")
+
+
+async def insert_batches(collection, docs_iter, batch_size: int, concurrency: int, stats: Stats):
+    """Inserta en lotes con varias insert_many en vuelo a la vez."""
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+    start = time.perf_counter()
+
+    async def insert(batch):
+        try:
+            await collection.insert_many(batch, ordered=False)
+            stats.add(collection.name, len(batch))
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            stats.add(collection.name, inserted)
+            print(f"⚠️  {collection.name}: {len(batch) - inserted} documentos rechazados (¿duplicados?)")
+        finally:
+            semaphore.release()
+
+    batch = []
+    for doc in docs_iter:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(insert(batch)))
+            batch = []
+    if batch:
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(insert(batch)))
+    await asyncio.gather(*tasks)
+    stats.add_time(collection.name, time.perf_counter() - start)
+
+
+def generate_members(rng: random.Random, count: int, seed: int, hashed_password: str, now: datetime):
+    for i in range(count):
+        yield {
+            "_id": new_id(rng),
+            "email": f"socio{i}@seed{seed}.gym",
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "role": "client",
+            "hashed_password": hashed_password,
+            "created_at": now - timedelta(days=rng.randint(0, 730)),
+        }
+
+
+def generate_activities(rng: random.Random, count: int, start_date: datetime, days: int, seed: int, now: datetime):
+    """
+    Una actividad por (día, franja, sala), sin solapes de sala ni de monitor:
+    en una misma franja cada sala tiene un monitor distinto.
+    """
+    slots = days * HOURS_PER_DAY * len(LOCATIONS)
+    if count > slots:
+        raise ValueError(f"Solo caben {slots:,} actividades en {days} días; amplía --days")
+
+    for slot in sorted(rng.sample(range(slots), count)):
+        day, rest = divmod(slot, HOURS_PER_DAY * len(LOCATIONS))
+        hour, loc = divmod(rest, len(LOCATIONS))
+        start_time = start_date + timedelta(days=day, hours=FIRST_HOUR + hour)
+        doc = {
+            "_id": new_id(rng),
+            "title": f"{rng.choice(TITLES)} {rng.choice(ADJECTIVES)}",
+            "description": f"Clase de {rng.randint(45, 60)} minutos",
+            "start_time": start_time,
+            "end_time": start_time + timedelta(minutes=rng.choice([45, 50, 55, 60])),
+            "capacity": rng.choice([10, 15, 20, 25, 30]),
+            "location": LOCATIONS[loc],
+            "instructor": INSTRUCTORS[(loc + day + hour) % len(INSTRUCTORS)],
+            "booked_count": 0,
+            "created_at": min(now, start_time - timedelta(days=rng.randint(1, 30))),
+            "seed": seed,
+        }
+        doc["keywords"] = build_search_keywords(doc)
+        yield doc
+
+
+def generate_reservations(rng: random.Random, members: list, activities: list, per_member: int, seed: int, now: datetime):
+    """
+    Historial de reservas por socio: como mucho una por franja horaria (sin
+    solapes), respetando el aforo y actualizando booked_count en memoria.
+    """
+    for user_id in members:
+        taken_slots = set()
+        for act in rng.sample(activities, min(per_member, len(activities))):
+            if act["start_time"] in taken_slots or act["booked_count"] >= act["capacity"]:
+                continue
+            taken_slots.add(act["start_time"])
+
+            statuses, weights = PAST_STATUSES if act["start_time"] < now else FUTURE_STATUSES
+            status = rng.choices(statuses, weights)[0]
+            if status in HOLDS_SPOT:
+                act["booked_count"] += 1
+
+            yield {
+                "_id": new_id(rng),
+                "user_id": user_id,
+                "activity_id": str(act["_id"]),
+                "activity_title": act["title"],
+                "activity_start_time": act["start_time"],
+                "activity_end_time": act["end_time"],
+                "status": status,
+                "created_at": act["start_time"] - timedelta(hours=rng.randint(1, 240)),
+                "seed": seed,
+            }
+
+
+async def seed(args):
+    if not MONGODB_URL:
+        print("❌ MONGODB_URL no encontrada en .env")
+        sys.exit(1)
+
+    client = AsyncIOMotorClient(MONGODB_URL)
+    db = client[DB_NAME]
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    start_date = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else \
+        (now - timedelta(days=args.days // 2)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if args.reset:
+        # Solo datos generados (de cualquier --seed); los índices se conservan
+        print("⚠️  Borrando actividades, reservas y socios generados (RESET)...")
+        await db.reservations.delete_many({"seed": {"$exists": True}})
+        await db.activities.delete_many({"seed": {"$exists": True}})
+        await db.users.delete_many({"email": {"$regex": r"@seed\d+\.gym$"}})
+
+    stats = Stats()
+
+    # 1. Socios (una sola llamada a bcrypt para todos)
+    print(f"👥 Generando {args.members:,} socios...")
+    hashed_password = get_password_hash(args.password)
+    member_ids = []
+
+    def members_iter():
+        for doc in generate_members(rng, args.members, args.seed, hashed_password, now):
+            member_ids.append(str(doc["_id"]))
+            yield doc
+
+    await insert_batches(db.users, members_iter(), args.batch_size, args.concurrency, stats)
+
+    # 2. Actividades (se guardan en memoria para controlar el aforo)
+    print(f"📅 Generando {args.activities:,} actividades desde {start_date:%Y-%m-%d} ({args.days} días)...")
+    activities = list(generate_activities(rng, args.activities, start_date, args.days, args.seed, now))
+
+    # 3. Reservas
+    print(f"🎟  Generando hasta {args.reservations_per_member} reservas por socio...")
+    await insert_batches(
+        db.reservations,
+        generate_reservations(rng, member_ids, activities, args.reservations_per_member, args.seed, now),
+        args.batch_size, args.concurrency, stats
+    )
+
+    # booked_count ya es definitivo: insertar actividades al final
+    await insert_batches(db.activities, iter(activities), args.batch_size, args.concurrency, stats)
+
+    stats.report()
+    print("ℹ️  Ejecuta 'python backend/init_db.py' para crear los índices si la BD estaba vacía.")
+    client.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para benchmarks.")
+    parser.add_argument("--members", type=int, default=1000, help="Número de socios")
+    parser.add_argument("--activities", type=int, default=500, help="Número de actividades")
+    parser.add_argument("--start-date", help="Primer día (YYYY-MM-DD); por defecto, la mitad del rango queda en el pasado")
+    parser.add_argument("--days", type=int, default=60, help="Días que cubre el calendario")
+    parser.add_argument("--reservations-per-member", type=int, default=10, help="Reservas (máx.) por socio")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para datos deterministas")
+    parser.add_argument("--password", default="pass", help="Contraseña común de los socios")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Documentos por insert_many")
+    parser.add_argument("--concurrency", type=int, default=4, help="insert_many simultáneos")
+    parser.add_argument("--reset", action="store_true", help="Borra antes las actividades, reservas y socios generados por este script (no toca datos reales)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(seed(parse_args()))
@@ -0,0 +1,47 @@
+"""
+Tests en proceso con STORAGE_BACKEND=memory. Ejecutar desde la raíz:
+    pip install -r backend/requirements-dev.txt
+    python -m pytest -q
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Antes de importar backend.core.config (settings se crea al importar)
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["REMINDERS_ENABLED"] = "false"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import pytest
+from backend.db import idempotency, resilience
+from backend.db.memory_storage import MemoryStorage
+from backend.db.storage import holder
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    idempotency._cache.clear()
+    resilience._snapshots.clear()
+    yield
+    holder.storage = None
+
+
+@pytest.fixture
+def storage():
+    holder.storage = MemoryStorage()
+    return holder.storage
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def engine(request, monkeypatch):
+    """Los dos motores detrás de get_storage(); mongo usa mongomock-motor si está instalado."""
+    if request.param == "memory":
+        holder.storage = MemoryStorage()
+    else:
+        mongomock_motor = pytest.importorskip("mongomock_motor")
+        from backend.db.mongo_storage import MongoStorage
+        # mongomock-motor no implementa with_options (read preference / concern)
+        monkeypatch.setattr(mongomock_motor.AsyncMongoMockCollection, "with_options", lambda self, **kwargs: self, raising=False)
+        holder.storage = MongoStorage(mongomock_motor.AsyncMongoMockClient()["test_db"])
+    return holder.storage
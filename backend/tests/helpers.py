@@ -0,0 +1,17 @@
+import asyncio
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def interleave(repository, *names):
+    """Cede el event loop antes de cada llamada para forzar carreras entre corrutinas."""
+    for name in names:
+        method = getattr(repository, name)
+
+        async def yielding(*args, _method=method, **kwargs):
+            await asyncio.sleep(0)
+            return await _method(*args, **kwargs)
+
+        setattr(repository, name, yielding)
@@ -0,0 +1,83 @@
+import pytest
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.core.security import create_access_token
+
+ACTIVITY = {
+    "title": "Yoga", "start_time": "2030-01-07T10:00:00Z", "end_time": "2030-01-07T11:00:00Z",
+    "capacity": 10, "location": "Sala 1", "instructor": "Ana",
+}
+EMAIL = "socio@test.gym"
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def login(client):
+    client.post("/auth/register", json={"email": EMAIL, "full_name": "Socio", "role": "client", "password": "pass"})
+    response = client.post("/auth/login", data={"username": EMAIL, "password": "pass"})
+    return response.json()["access_token"]
+
+
+def add_activity(client):
+    admin = create_access_token({"sub": "admin@admin.com", "role": "admin"})
+    return client.post("/activities/", json=ACTIVITY, headers=bearer(admin)).json()["_id"]
+
+
+def test_dashboard_with_uid_in_token(client):
+    activity_id = add_activity(client)
+    token = login(client)
+    reservation_id = client.post("/reservations/", json={"activity_id": activity_id}, headers=bearer(token)).json()["_id"]
+
+    response = client.get("/dashboard", headers=bearer(token))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"]["email"] == EMAIL
+    assert [r["_id"] for r in body["reservations"]] == [reservation_id]
+    assert body["activities"][0]["my_reservation_id"] == reservation_id
+    assert body["activities"][0]["my_reservation_status"] == "active"
+
+
+def test_dashboard_with_legacy_token_without_uid(client):
+    add_activity(client)
+    login(client)
+    response = client.get("/dashboard", headers=bearer(create_access_token({"sub": EMAIL, "role": "client"})))
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == EMAIL
+    assert response.json()["activities"][0]["my_reservation_id"] is None
+
+
+def test_uid_that_does_not_match_the_email_is_rejected(client):
+    login(client)
+    admin_id = client.get("/auth/me", headers=bearer(create_access_token({"sub": "admin@admin.com", "role": "admin"}))).json()["id"]
+    forged = create_access_token({"sub": EMAIL, "role": "client", "uid": admin_id})
+    assert client.get("/dashboard", headers=bearer(forged)).status_code == 401
+    unknown = create_access_token({"sub": "nadie@test.gym", "role": "client"})
+    assert client.get("/dashboard", headers=bearer(unknown)).status_code == 401
+
+
+def test_active_reservation_wins_over_cancelled_ones(client):
+    activity_id = add_activity(client)
+    token = login(client)
+    first = client.post("/reservations/", json={"activity_id": activity_id}, headers=bearer(token)).json()["_id"]
+    assert client.put(f"/reservations/{first}/cancel", headers=bearer(token)).status_code == 200
+    second = client.post("/reservations/", json={"activity_id": activity_id}, headers=bearer(token)).json()["_id"]
+
+    body = client.get("/dashboard", headers=bearer(token)).json()
+    assert {r["_id"] for r in body["reservations"]} == {first, second}
+    assert body["activities"][0]["my_reservation_id"] == second
+    assert body["activities"][0]["my_reservation_status"] == "active"
+
+
+def test_limit_is_bounded(client):
+    token = login(client)
+    assert client.get("/dashboard", params={"limit": 101}, headers=bearer(token)).status_code == 422
+    assert client.get("/dashboard", params={"limit": 0}, headers=bearer(token)).status_code == 422
+    assert client.get("/dashboard", params={"limit": 100}, headers=bearer(token)).status_code == 200
@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.core.fieldsets import parse_fields
+from backend.core.security import create_access_token
+from backend.models.activity import ActivityInDB
+from backend.models.reservation import ReservationInDB
+from backend.models.user import UserResponse
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def admin_headers():
+    token = create_access_token({"sub": "admin@admin.com", "role": "admin"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def add_activities(client, count, first=0):
+    for i in range(first, first + count):
+        start = START + timedelta(hours=i)
+        response = client.post("/activities/", headers=admin_headers(), json={
+            "title": f"Clase {i}", "description": "Sesión de prueba " * 5,
+            "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=50)).isoformat(),
+            "capacity": 10, "location": "Sala 1", "instructor": "Ana",
+        })
+        assert response.status_code == 201
+
+
+def test_parse_fields_maps_aliases_and_always_includes_id():
+    assert parse_fields(None, ActivityInDB) is None
+    assert parse_fields("", ActivityInDB) is None
+    assert parse_fields("title, start_time", ActivityInDB) == {"_id": 1, "title": 1, "start_time": 1}
+    # id y su alias _id son el mismo campo de Mongo
+    assert parse_fields("id", ActivityInDB) == parse_fields("_id", ActivityInDB) == {"_id": 1}
+    assert parse_fields("id,email", UserResponse) == {"_id": 1, "email": 1}
+    assert parse_fields("activity_title", ReservationInDB) == {"_id": 1, "activity_title": 1}
+
+
+def test_parse_fields_rejects_unknown_fields():
+    with pytest.raises(HTTPException) as error:
+        parse_fields("title,nope,hashed_password", ActivityInDB)
+    assert error.value.status_code == 400
+    assert error.value.detail == "Unknown fields: nope, hashed_password"
+
+
+def test_list_only_returns_requested_fields(client):
+    add_activities(client, 2)
+    response = client.get("/activities/", params={"fields": "title,start_time"})
+    assert response.status_code == 200
+    docs = response.json()
+    assert [set(doc) for doc in docs] == [{"_id", "title", "start_time"}] * 2
+    assert docs[0]["title"] == "Clase 0"
+    assert docs[0]["start_time"] == "2030-01-07T10:00:00Z"
+    assert client.get("/activities/", params={"fields": "title,bogus"}).status_code == 400
+
+
+def test_users_never_expose_password_hash(client):
+    full = client.get("/auth/users", headers=admin_headers()).json()
+    assert full and all("hashed_password" not in user for user in full)
+
+    partial = client.get("/auth/users", params={"fields": "id,email"}, headers=admin_headers()).json()
+    assert [set(user) for user in partial] == [{"id", "email"}] * len(full)
+    response = client.get("/auth/users", params={"fields": "email,hashed_password"}, headers=admin_headers())
+    assert response.status_code == 400
+
+
+def test_only_large_responses_are_gzipped(client):
+    add_activities(client, 1)
+    small = client.get("/activities/", params={"fields": "title"}, headers={"Accept-Encoding": "gzip"})
+    assert len(small.content) < 1000
+    assert "content-encoding" not in small.headers
+
+    add_activities(client, 19, first=1)
+    large = client.get("/activities/", headers={"Accept-Encoding": "gzip"})
+    assert len(large.content) > 1000
+    assert large.headers["content-encoding"] == "gzip"
+    assert len(large.json()) == 20
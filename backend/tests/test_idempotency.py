@@ -0,0 +1,104 @@
+import pytest
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.core.security import create_access_token
+from backend.db import idempotency
+from backend.db.resilience import DatabaseUnavailable
+from backend.db.storage import get_storage
+
+ACTIVITY = {
+    "title": "Yoga", "start_time": "2030-01-07T10:00:00Z", "end_time": "2030-01-07T11:00:00Z",
+    "capacity": 10, "location": "Sala 1", "instructor": "Ana",
+}
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def admin_headers(key):
+    token = create_access_token({"sub": "admin@admin.com", "role": "admin"})
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+
+def client_headers(client, key, email="socio@test.gym"):
+    client.post("/auth/register", json={"email": email, "full_name": "Socio", "role": "client", "password": "pass"})
+    token = create_access_token({"sub": email, "role": "client"})
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+
+def fail_after_write(monkeypatch, repository, name):
+    """La escritura se aplica pero el driver agota el plazo (resultado desconocido)."""
+    method = getattr(repository, name)
+
+    async def applied_then_timeout(*args, **kwargs):
+        await method(*args, **kwargs)
+        raise DatabaseUnavailable(1)
+
+    monkeypatch.setattr(repository, name, applied_then_timeout)
+    return lambda: monkeypatch.setattr(repository, name, method)
+
+
+def test_retry_with_same_key_replays_first_response(client):
+    first = client.post("/activities/", json=ACTIVITY, headers=admin_headers("k1"))
+    # Mismo instante con otro formato: mismo cuerpo canónico
+    retry = client.post("/activities/", json={**ACTIVITY, "start_time": "2030-01-07T10:00:00+00:00"}, headers=admin_headers("k1"))
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["_id"] == first.json()["_id"]
+    assert len(client.get("/activities/").json()) == 1
+
+
+def test_same_key_with_different_body_is_rejected(client):
+    client.post("/activities/", json=ACTIVITY, headers=admin_headers("k2"))
+    reused = client.post("/activities/", json={**ACTIVITY, "location": "Sala 2"}, headers=admin_headers("k2"))
+    assert reused.status_code == 422
+    assert len(client.get("/activities/").json()) == 1
+
+
+def test_retry_after_unconfirmed_reservation_replays_it_as_created(client, monkeypatch):
+    activity_id = client.post("/activities/", json=ACTIVITY, headers=admin_headers("a1")).json()["_id"]
+    headers = client_headers(client, "r1")
+    restore = fail_after_write(monkeypatch, get_storage().reservations, "insert")
+
+    assert client.post("/reservations/", json={"activity_id": activity_id}, headers=headers).status_code == 503
+    restore()
+    # La clave sigue en curso: no se libera ni se guarda un error
+    assert client.post("/reservations/", json={"activity_id": activity_id}, headers=headers).status_code == 409
+
+    monkeypatch.setattr(idempotency, "PROCESSING_TIMEOUT_SECONDS", -1)
+    retry = client.post("/reservations/", json={"activity_id": activity_id}, headers=headers)
+    assert retry.status_code == 201
+    stored = client.get("/reservations/me", headers=headers).json()
+    assert [r["_id"] for r in stored] == [retry.json()["_id"]]
+
+    replay = client.post("/reservations/", json={"activity_id": activity_id}, headers=headers)
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["_id"] == retry.json()["_id"]
+
+
+def test_retry_after_unconfirmed_activity_replays_it_as_created(client, monkeypatch):
+    restore = fail_after_write(monkeypatch, get_storage().activities, "insert")
+    assert client.post("/activities/", json=ACTIVITY, headers=admin_headers("a2")).status_code == 503
+    restore()
+
+    monkeypatch.setattr(idempotency, "PROCESSING_TIMEOUT_SECONDS", -1)
+    retry = client.post("/activities/", json=ACTIVITY, headers=admin_headers("a2"))
+    assert retry.status_code == 201
+    assert [a["_id"] for a in client.get("/activities/").json()] == [retry.json()["_id"]]
+
+
+def test_resumed_key_still_runs_the_request_if_nothing_was_stored(client, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise DatabaseUnavailable(1)
+
+    monkeypatch.setattr(get_storage().activities, "insert", unavailable)
+    assert client.post("/activities/", json=ACTIVITY, headers=admin_headers("a3")).status_code == 503
+    monkeypatch.undo()
+
+    monkeypatch.setattr(idempotency, "PROCESSING_TIMEOUT_SECONDS", -1)
+    assert client.post("/activities/", json=ACTIVITY, headers=admin_headers("a3")).status_code == 201
+    assert len(client.get("/activities/").json()) == 1
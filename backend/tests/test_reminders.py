@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from backend.core.reminders import ReminderScheduler, ReminderSender
+from backend.db.activities import delete_activity
+from backend.models.reservation import ReservationStatus
+from helpers import run
+
+
+class RecordingSender(ReminderSender):
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+
+    async def send_batch(self, reminders):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("smtp down")
+        self.batches.append(reminders)
+
+
+def new_user(storage, email="u@test.gym"):
+    return str(run(storage.users.insert({"email": email, "full_name": "U", "role": "client", "created_at": datetime.utcnow()})))
+
+
+def reserve(storage, user_id, minutes_ahead):
+    start = datetime.utcnow() + timedelta(minutes=minutes_ahead)
+    activity_id = str(run(storage.activities.insert({
+        "title": f"Clase {minutes_ahead}", "start_time": start, "end_time": start + timedelta(minutes=50),
+        "capacity": 10, "booked_count": 1, "location": f"Sala {user_id}", "instructor": "Ana",
+    })))
+    return str(run(storage.reservations.insert({
+        "user_id": user_id, "activity_id": activity_id, "activity_title": f"Clase {minutes_ahead}",
+        "activity_start_time": start, "activity_end_time": start + timedelta(minutes=50),
+        "status": ReservationStatus.ACTIVE, "created_at": datetime.utcnow(),
+    })))
+
+
+def scheduler(sender, window_seconds=10 ** 9):
+    # Ventana enorme por defecto: todo lo vencido cae en el mismo lote
+    return ReminderScheduler(sender, lead=timedelta(minutes=60), tick_seconds=0, window_seconds=window_seconds, horizon=timedelta(hours=24))
+
+
+def test_due_reminders_are_sent_once_in_one_batch(storage):
+    user_id = new_user(storage)
+    soon = [reserve(storage, user_id, 30), reserve(storage, user_id, 40)]
+    reserve(storage, user_id, 180)  # todavía no toca
+    reserve(storage, user_id, 60 * 48)  # fuera del horizonte: no se carga
+
+    sender = RecordingSender()
+    reminders = scheduler(sender)
+    run(reminders.load_until(datetime.utcnow() + reminders.horizon))
+    assert len(reminders.scheduled) == 3
+
+    run(reminders.dispatch_due())
+    assert len(sender.batches) == 1
+    assert sorted(r["reservation_id"] for r in sender.batches[0]) == sorted(soon)
+    assert sender.batches[0][0]["email"] == "u@test.gym"
+    assert all(run(storage.reservations.get(rid))["reminder_sent_at"] for rid in soon)
+
+    run(reminders.dispatch_due())
+    assert len(sender.batches) == 1
+
+
+def test_batches_are_split_by_window(storage):
+    reserve(storage, new_user(storage, "u1@test.gym"), 10)
+    reserve(storage, new_user(storage, "u2@test.gym"), 30)
+    sender = RecordingSender()
+    reminders = scheduler(sender, window_seconds=60)
+    run(reminders.load_until(datetime.utcnow() + reminders.horizon))
+    run(reminders.dispatch_due())
+    assert [len(batch) for batch in sender.batches] == [1, 1]
+
+
+def test_cancelled_reservations_are_skipped(storage):
+    kept, cancelled, changed = (reserve(storage, new_user(storage, f"u{i}@test.gym"), 30) for i in range(3))
+    sender = RecordingSender()
+    reminders = scheduler(sender)
+    run(reminders.load_until(datetime.utcnow() + reminders.horizon))
+
+    reminders.cancel(cancelled)
+    # Cancelada en BD sin pasar por el hook: se descarta al releerla
+    run(storage.reservations.set_status(changed, ReservationStatus.CANCELLED))
+    run(reminders.dispatch_due())
+    assert [r["reservation_id"] for batch in sender.batches for r in batch] == [kept]
+
+
+def test_failed_batch_is_retried(storage):
+    rid = reserve(storage, new_user(storage), 30)
+    sender = RecordingSender(failures=1)
+    reminders = scheduler(sender)
+    run(reminders.load_until(datetime.utcnow() + reminders.horizon))
+
+    run(reminders.dispatch_due())
+    assert sender.batches == []
+    assert run(storage.reservations.get(rid)).get("reminder_sent_at") is None
+
+    run(reminders.dispatch_due())
+    assert [r["reservation_id"] for r in sender.batches[0]] == [rid]
+
+
+def test_deleted_activities_and_users_are_not_reminded(storage):
+    kept = reserve(storage, new_user(storage, "kept@test.gym"), 30)
+    class_gone = reserve(storage, new_user(storage, "class@test.gym"), 30)
+    member_gone = reserve(storage, new_user(storage, "member@test.gym"), 30)
+    sender = RecordingSender()
+    reminders = scheduler(sender)
+    run(reminders.load_until(datetime.utcnow() + reminders.horizon))
+
+    # Borrados directos en la BD (sin pasar por delete_activity): se descartan al releer
+    run(storage.activities.delete(run(storage.reservations.get(class_gone))["activity_id"]))
+    run(storage.users.delete(run(storage.reservations.get(member_gone))["user_id"]))
+    run(reminders.dispatch_due())
+    assert [r["reservation_id"] for batch in sender.batches for r in batch] == [kept]
+
+
+def test_delete_activity_cancels_its_reservations(storage):
+    rid = reserve(storage, new_user(storage), 30)
+    activity_id = run(storage.reservations.get(rid))["activity_id"]
+    assert run(delete_activity(activity_id)) == 1
+    assert run(storage.reservations.get(rid))["status"] == ReservationStatus.CANCELLED
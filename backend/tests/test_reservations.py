@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from backend.db.activities import create_activity
+from backend.db.reservations import create_reservation_db, cancel_reservation_db
+from backend.models.activity import ActivityCreate
+from backend.models.reservation import ReservationCreate, ReservationStatus
+from helpers import run, interleave
+
+START = datetime.utcnow().replace(microsecond=0) + timedelta(days=7)
+
+
+def new_activity(title="Yoga", location="Sala 1", instructor="Ana", hours=0, capacity=5):
+    activity = ActivityCreate(
+        title=title, start_time=START + timedelta(hours=hours), end_time=START + timedelta(hours=hours, minutes=50),
+        capacity=capacity, location=location, instructor=instructor,
+    )
+    activity_id, error = run(create_activity(activity))
+    assert error is None
+    return str(activity_id)
+
+
+def new_users(storage, count):
+    return [
+        str(run(storage.users.insert({"email": f"u{i}@test.gym", "full_name": f"U{i}", "role": "client", "created_at": START})))
+        for i in range(count)
+    ]
+
+
+def book(user_id, activity_id):
+    return create_reservation_db(user_id, ReservationCreate(activity_id=activity_id))
+
+
+def test_concurrent_bookings_never_exceed_capacity(storage):
+    activity_id = new_activity(capacity=3)
+    users = new_users(storage, 10)
+    # Todas leen el aforo antes de que nadie reserve
+    interleave(storage.activities, "get", "book_spot")
+
+    async def book_all():
+        return await asyncio.gather(*(book(user_id, activity_id) for user_id in users))
+
+    results = run(book_all())
+    assert sum(1 for _, error in results if error is None) == 3
+    assert {error for _, error in results if error} == {"Activity is full"}
+    assert run(storage.activities.get(activity_id))["booked_count"] == 3
+
+
+def test_cancel_releases_spot_exactly_once(storage):
+    activity_id = new_activity(capacity=2)
+    (user_id,) = new_users(storage, 1)
+    reservation_id, _ = run(book(user_id, activity_id))
+    interleave(storage.reservations, "get", "set_status")
+
+    async def cancel_twice():
+        return await asyncio.gather(*(cancel_reservation_db(reservation_id, user_id) for _ in range(2)))
+
+    results = run(cancel_twice())
+    assert [error for _, error in results].count(None) == 1
+    assert run(storage.activities.get(activity_id))["booked_count"] == 0
+    assert run(storage.reservations.get(reservation_id))["status"] == ReservationStatus.CANCELLED
+
@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from fastapi import Response
+from pymongo.errors import DuplicateKeyError, NetworkTimeout
+from backend.db.resilience import CircuitBreaker, DatabaseUnavailable, ResilientRepository, read_with_snapshot
+from helpers import run
+
+
+class FakeRepository:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    async def list(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return ["ok"]
+
+    async def insert(self, doc):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return 1
+
+
+@pytest.fixture
+def repo():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    fake = FakeRepository()
+    return fake, breaker, ResilientRepository("fake", fake, breaker)
+
+
+def expire(breaker):
+    breaker.opened_at -= breaker.reset_seconds
+
+
+def test_opens_after_consecutive_timeouts_and_fails_fast(repo):
+    fake, breaker, resilient = repo
+    fake.error = NetworkTimeout("stalled")
+    for _ in range(2):
+        with pytest.raises(DatabaseUnavailable):
+            run(resilient.list())
+    assert breaker.state == "open"
+
+    with pytest.raises(DatabaseUnavailable) as exc:
+        run(resilient.list())
+    assert fake.calls == 2  # no llega al repositorio
+    assert exc.value.retry_after > 0
+
+
+def test_half_open_probe_closes_or_reopens(repo):
+    fake, breaker, resilient = repo
+    fake.error = NetworkTimeout("stalled")
+    for _ in range(2):
+        with pytest.raises(DatabaseUnavailable):
+            run(resilient.list())
+
+    expire(breaker)
+    assert breaker.state == "half_open"
+    with pytest.raises(DatabaseUnavailable):
+        run(resilient.list())
+    assert breaker.state == "open"  # la prueba falló: vuelve a abrirse
+
+    expire(breaker)
+    fake.error = None
+    assert run(resilient.list()) == ["ok"]
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_half_open_lets_a_single_probe_through(repo):
+    fake, breaker, resilient = repo
+    breaker.opened_at = 0.0  # abierto hace mucho → half_open
+    release = asyncio.Event()
+
+    async def slow_list():
+        await release.wait()
+        return ["ok"]
+
+    fake.list = slow_list
+
+    async def scenario():
+        probe = asyncio.create_task(resilient.list())
+        await asyncio.sleep(0)
+        with pytest.raises(DatabaseUnavailable):
+            await resilient.list()
+        release.set()
+        return await probe
+
+    assert run(scenario()) == ["ok"]
+    assert breaker.state == "closed"
+
+
+def test_writes_need_closed_circuit_and_do_not_count(repo):
+    fake, breaker, resilient = repo
+    fake.error = NetworkTimeout("stalled")
+    for _ in range(3):
+        with pytest.raises(DatabaseUnavailable):
+            run(resilient.insert({}))
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+    breaker.record_failure()
+    breaker.record_failure()
+    calls = fake.calls
+    with pytest.raises(DatabaseUnavailable):
+        run(resilient.insert({}))
+    assert fake.calls == calls
+    expire(breaker)
+    with pytest.raises(DatabaseUnavailable):
+        run(resilient.insert({}))  # half_open: las escrituras no hacen de prueba
+
+
+def test_query_errors_pass_through(repo):
+    fake, breaker, resilient = repo
+    fake.error = DuplicateKeyError("dup")
+    with pytest.raises(DuplicateKeyError):
+        run(resilient.insert({}))
+    with pytest.raises(DuplicateKeyError):
+        run(resilient.list())
+    assert breaker.failures == 0
+
+
+def test_snapshot_served_when_database_unavailable():
+    async def ok():
+        return [{"title": "Yoga"}]
+
+    async def down():
+        raise DatabaseUnavailable(5)
+
+    fresh = Response()
+    assert run(read_with_snapshot(("list",), fresh, ok)) == [{"title": "Yoga"}]
+    assert "x-data-stale" not in fresh.headers
+
+    stale = Response()
+    assert run(read_with_snapshot(("list",), stale, down)) == [{"title": "Yoga"}]
+    assert stale.headers["x-data-stale"] == "true"
+    assert int(stale.headers["age"]) >= 0
+
+    with pytest.raises(DatabaseUnavailable):
+        run(read_with_snapshot(("other",), Response(), down))
@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime, timedelta
+from backend.db.activities import INVALID_SCHEDULE, create_activity, find_schedule_conflict, update_activity, validate_activity_batch
+from backend.db.reservations import create_reservation_db, find_member_overlap
+from backend.models.activity import ActivityCreate, ActivityUpdate
+from backend.models.reservation import ReservationCreate, ReservationStatus
+from helpers import run, interleave
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def at(minutes):
+    return START + timedelta(minutes=minutes)
+
+
+def activity(title, start, end, location="Sala 1", instructor="Ana"):
+    return ActivityCreate(title=title, start_time=at(start), end_time=at(end), capacity=10, location=location, instructor=instructor)
+
+
+def new_activity(title, start, end, location="Sala 1", instructor="Ana"):
+    activity_id, error = run(create_activity(activity(title, start, end, location, instructor)))
+    assert error is None
+    return str(activity_id)
+
+
+def new_user(storage, email="socio@test.gym"):
+    return str(run(storage.users.insert({"email": email, "full_name": "Socio", "role": "client", "created_at": START})))
+
+
+def book(user_id, activity_id):
+    return create_reservation_db(user_id, ReservationCreate(activity_id=activity_id))
+
+
+def test_schedule_conflict_probes(engine):
+    # [0, 60) y [120, 180) en Sala 1
+    for title, start, end in (("A", 0, 60), ("B", 120, 180)):
+        _, error = run(create_activity(activity(title, start, end, instructor=title)))
+        assert error is None
+
+    def conflict(start, end):
+        doc = run(find_schedule_conflict("location", "Sala 1", at(start), at(end)))
+        return doc["title"] if doc else None
+
+    assert conflict(30, 90) == "A"      # la anterior sigue en curso
+    assert conflict(90, 150) == "B"     # otra empieza dentro
+    assert conflict(-30, 200) == "A"    # la envuelve
+    assert conflict(60, 120) is None    # entre las dos, bordes contiguos
+    assert conflict(180, 240) is None
+    assert run(find_schedule_conflict("location", "Sala 2", at(30), at(90))) is None
+
+
+def test_schedule_conflict_ignores_excluded_activity(engine):
+    activity_id, _ = run(create_activity(activity("A", 0, 60)))
+    assert run(find_schedule_conflict("location", "Sala 1", at(0), at(60), exclude_id=activity_id)) is None
+
+
+def test_create_activity_rejects_room_and_instructor_overlaps(engine):
+    assert run(create_activity(activity("A", 0, 60)))[1] is None
+    assert "location 'Sala 1'" in run(create_activity(activity("B", 30, 90, instructor="Bruno")))[1]
+    assert "instructor 'Ana'" in run(create_activity(activity("C", 30, 90, location="Sala 2")))[1]
+    assert run(create_activity(activity("D", 60, 120)))[1] is None
+
+
+def test_member_overlap_probes(engine):
+    reservations = engine.reservations
+
+    def reserve(start, end):
+        return run(reservations.insert({
+            "user_id": "u1", "activity_id": f"act-{start}", "activity_title": f"T{start}",
+            "activity_start_time": at(start), "activity_end_time": at(end),
+            "status": ReservationStatus.ACTIVE, "created_at": START,
+        }))
+
+    first = reserve(0, 60)
+    reserve(120, 180)
+
+    def overlap(start, end, exclude_id=None):
+        doc = run(find_member_overlap("u1", at(start), at(end), exclude_id))
+        return doc["activity_title"] if doc else None
+
+    assert overlap(30, 90) == "T0"
+    assert overlap(90, 150) == "T120"
+    assert overlap(60, 120) is None
+    assert overlap(0, 60, exclude_id=first) is None
+    assert run(find_member_overlap("u2", at(30), at(90))) is None
+
+
+def test_concurrent_creates_never_store_an_overlap(storage):
+    interleave(storage.activities, "first_starting_between", "last_starting_before")
+
+    async def create_both():
+        return await asyncio.gather(
+            create_activity(activity("A", 0, 60, instructor="Ana")),
+            create_activity(activity("B", 30, 90, instructor="Bruno")),
+        )
+
+    run(create_both())
+    stored = run(storage.activities.list())
+    assert len(stored) <= 1
+
+
+def test_validate_batch_checks_batch_and_stored_activities(storage):
+    run(create_activity(activity("Stored", 0, 60)))
+    errors = run(validate_activity_batch([
+        activity("Clash with stored", 30, 90, location="Sala 1", instructor="Bruno"),
+        activity("Long", 120, 300, location="Sala 2", instructor="Carla"),
+        activity("Short", 150, 160, location="Sala 3", instructor="Diego"),
+        activity("Inside long", 200, 220, location="Sala 2", instructor="Elena"),
+    ]))
+    assert [e["index"] for e in errors] == [0, 3]
+
+
+def test_member_cannot_double_book_overlapping_classes(storage):
+    yoga = new_activity("Yoga", 0, 50)
+    spinning = new_activity("Spinning", 0, 50, "Sala 2", "Bruno")
+    later = new_activity("Pilates", 50, 100)
+    user_id = new_user(storage)
+
+    assert run(book(user_id, yoga))[1] is None
+    assert run(book(user_id, spinning))[1].startswith("You already have a reservation at that time")
+    # Empieza justo cuando acaba la anterior: no es solape
+    assert run(book(user_id, later))[1] is None
+    assert run(storage.activities.get(spinning))["booked_count"] == 0
+
+
+def test_concurrent_overlapping_bookings_keep_at_most_one(storage):
+    yoga = new_activity("Yoga", 0, 50)
+    spinning = new_activity("Spinning", 0, 50, "Sala 2", "Bruno")
+    user_id = new_user(storage)
+    interleave(storage.reservations, "first_active_starting_between", "last_active_starting_before")
+
+    async def book_both():
+        return await asyncio.gather(book(user_id, yoga), book(user_id, spinning))
+
+    run(book_both())
+    active = [r for r in run(storage.reservations.list_by_user(user_id)) if r["status"] == ReservationStatus.ACTIVE]
+    assert len(active) <= 1
+    booked = sum(run(storage.activities.get(a))["booked_count"] for a in (yoga, spinning))
+    assert booked == len(active)
+
+
+def test_moving_a_class_onto_a_members_other_booking_is_rejected(storage):
+    first = new_activity("B", 0, 60)
+    moved = new_activity("C", 180, 240, "Sala 2", "Bruno")
+    user_id = new_user(storage)
+    assert run(book(user_id, first))[1] is None
+    assert run(book(user_id, moved))[1] is None
+
+    count, error = run(update_activity(moved, ActivityUpdate(start_time=at(30), end_time=at(90))))
+    assert count == 0
+    assert error == [{"user_id": user_id, "error": "Already booked at that time: B"}]
+    # Ni la clase ni la copia del horario en la reserva han cambiado
+    assert run(storage.activities.get(moved))["start_time"] == at(180)
+    reservation = run(storage.reservations.find_active(user_id, moved))
+    assert reservation["activity_start_time"] == at(180)
+
+    assert run(update_activity(moved, ActivityUpdate(start_time=at(60), end_time=at(120)))) == (1, None)
+    assert run(storage.reservations.find_active(user_id, moved))["activity_start_time"] == at(60)
+
+
+def test_update_with_end_before_start_is_a_validation_error(storage):
+    activity_id = new_activity("A", 0, 60)
+    assert run(update_activity(activity_id, ActivityUpdate(end_time=at(-10)))) == (0, INVALID_SCHEDULE)
@@ -0,0 +1,95 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.db.activities import create_activity, search_activities
+from backend.db.mongo_storage import MongoStorage
+from backend.models.activity import ActivityCreate
+from helpers import run
+
+START = datetime(2030, 1, 7, 10, 0)
+
+
+def at(hours):
+    return START + timedelta(hours=hours)
+
+
+def add(title, hours, instructor="Ana", description=None, capacity=10):
+    activity = ActivityCreate(
+        title=title, description=description, start_time=at(hours), end_time=at(hours) + timedelta(minutes=50),
+        capacity=capacity, location=f"Sala {hours}", instructor=instructor,
+    )
+    activity_id, error = run(create_activity(activity))
+    assert error is None
+    return str(activity_id)
+
+
+def titles(q=None, prefix=False, **kwargs):
+    return [doc["title"] for doc in run(search_activities(q, prefix, **kwargs))]
+
+
+@pytest.fixture
+def catalog(engine):
+    add("Pilates suelo", 3, instructor="Bruno")
+    add("Yoga", 1, instructor="Carla", description="Estiramientos suaves")
+    add("Pilátes máquina", 2, instructor="Ana")
+    add("Spinning", 0, instructor="Ana", description="Cardio con yoga al final")
+    return engine
+
+
+def test_prefix_matches_every_term_ordered_by_start(catalog):
+    assert titles("pil", prefix=True) == ["Pilátes máquina", "Pilates suelo"]
+    assert titles("pil an", prefix=True) == ["Pilátes máquina"]
+    assert titles("yog", prefix=True) == ["Spinning", "Yoga"]
+    assert titles("xyz", prefix=True) == []
+
+
+def test_prefix_folds_accents_and_case(catalog):
+    assert titles("PILÁ", prefix=True) == titles("pila", prefix=True) == ["Pilátes máquina", "Pilates suelo"]
+    assert titles("maquina", prefix=True) == ["Pilátes máquina"]
+
+
+def test_full_text_needs_whole_words_and_ranks_by_relevance(catalog):
+    if isinstance(catalog, MongoStorage):
+        pytest.skip("mongomock no implementa $text")
+    # La palabra en el título pesa más que en la descripción
+    assert titles("yoga") == ["Yoga", "Spinning"]
+    assert titles("pil") == []
+    assert titles("pilates") == ["Pilátes máquina", "Pilates suelo"]
+
+
+def test_date_range_is_start_inclusive_end_exclusive(catalog):
+    assert titles(date_from=at(1), date_to=at(3)) == ["Yoga", "Pilátes máquina"]
+    assert titles("pil", prefix=True, date_from=at(3)) == ["Pilates suelo"]
+
+
+def test_available_hides_full_classes(catalog):
+    full = add("Boxeo", 4, instructor="Diego", capacity=1)
+    assert run(catalog.activities.book_spot(full))
+    assert "Boxeo" in titles()
+    assert "Boxeo" not in titles(available=True)
+    assert titles("box", prefix=True, available=True) == []
+
+
+def test_pagination_walks_the_same_order(catalog):
+    everything = titles()
+    assert everything == ["Spinning", "Yoga", "Pilátes máquina", "Pilates suelo"]
+    pages = [titles(skip=skip, limit=2) for skip in (0, 2, 4)]
+    assert pages == [everything[:2], everything[2:], []]
+    assert titles("pil", prefix=True, skip=1, limit=1) == ["Pilates suelo"]
+
+
+def test_search_endpoint():
+    with TestClient(app) as client:
+        # El lifespan crea su propio almacenamiento en memoria
+        for hours, title in ((0, "Pilates suelo"), (1, "Yoga")):
+            run(create_activity(ActivityCreate(
+                title=title, start_time=at(hours), end_time=at(hours) + timedelta(minutes=50),
+                capacity=10, location=f"Sala {hours}", instructor="Ana",
+            )))
+        response = client.get("/activities/search", params={"q": "pilá", "prefix": "true", "fields": "title"})
+        assert response.status_code == 200
+        assert [set(doc) for doc in response.json()] == [{"_id", "title"}]
+        assert response.json()[0]["title"] == "Pilates suelo"
+        assert client.get("/activities/search", params={"limit": 101}).status_code == 422
+        assert client.get("/activities/search", params={"q": "x" * 101}).status_code == 422